@@ -4,6 +4,11 @@ import folium
 from streamlit_folium import st_folium
 from st_aggrid import AgGrid, GridOptionsBuilder
 from plot_ProgressBar import plotProgressBar
+from data_store import load_sheets
+import corridor_map
+from diagnostics import render as render_diagnostics
+from profiling import stage, record_payload
+import session_memory
 
 
 st.set_page_config(
@@ -11,6 +16,7 @@ st.set_page_config(
     page_icon="👋",
     layout="wide",
 )
+session_memory.track("Utility")
 
 # Inject custom CSS to widen the main container and reduce padding
 st.markdown(
@@ -26,6 +32,11 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# Hidden diagnostics view: open the app with ?diagnostics=1
+if "diagnostics" in st.query_params:
+    render_diagnostics()
+    st.stop()
+
 # Define custom CSS for styling
 custom_css = {
     ".ag-header": {  # Header background color
@@ -61,20 +72,24 @@ if "selected_station" not in st.session_state or st.session_state.selected_stati
     st.session_state.selected_station = selected_station  # Store selection
     file_path = station_files[selected_station]  # Get corresponding file
     
-    # Load all sheets from Excel file into a dictionary
-    st.session_state.sheets = pd.read_excel(file_path, sheet_name=None)
+    # Load all sheets from Excel file into a shared, read-only dictionary
+    st.session_state.sheets = load_sheets(file_path)
 
-progressFile = pd.read_excel("data/progress.xlsx")
+progressFile = next(iter(load_sheets("data/progress.xlsx").values()))
 plotProgressBar(progressFile)
 
-def main():    
-    sheets = st.session_state.sheets
-    
-    corridor_data = sheets["Corridor Work"]
-    
-    # Sidebar for corridor selection
-    st.sidebar.title("Select Corridor")
-    selected_corridor = st.sidebar.selectbox("Choose a corridor", corridor_data["Corridor"].unique())
+st.write("### Corridor Progress Map")
+with stage("Utility.corridor_map"):
+    map_html = corridor_map.render(selected_station)
+record_payload("Utility.corridor_map", map_html)
+
+@st.fragment
+def work_breakdown(corridor_data):
+    """Corridor/section selectors and the AgGrid; a selection reruns only this fragment"""
+    # Selectors live in the fragment body: a fragment cannot write to the sidebar
+    col1, col2 = st.columns(2)
+    with col1:
+        selected_corridor = st.selectbox("Choose a corridor", corridor_data["Corridor"].unique())
     
     # Filter sections based on selected corridor
     sections_in_corridor = corridor_data[corridor_data["Corridor"] == selected_corridor]["Section"].unique()
@@ -83,7 +98,8 @@ def main():
     if len(sections_in_corridor) > 1:
         sections_in_corridor = ["All"] + list(sections_in_corridor)
         
-    selected_section = st.sidebar.selectbox("Choose a section", sections_in_corridor)
+    with col2:
+        selected_section = st.selectbox("Choose a section", sections_in_corridor)
     
     # Filter data based on selected corridor and section
     if selected_section == "All":
@@ -95,18 +111,15 @@ def main():
         ]
     
     # Display sections available for the selected corridor
-    st.sidebar.write(f"**{selected_corridor} comprises the following sections:**")
-    for section in sections_in_corridor:
-        if section != "All":  # Skip "All" in the list
-            st.sidebar.write(f"- Section - {section}")
+    sections = ", ".join(f"Section - {section}" for section in sections_in_corridor if section != "All")
+    st.caption(f"**{selected_corridor}** comprises the following sections: {sections}")
     
     # Display work breakdown
     st.title(f"{selected_corridor}: Section-{selected_section} Work Progress")
     st.write("### Work Breakdown")
     
-    filtered_data["Grouped Task"] = filtered_data["Task Group"].apply(
-        lambda x: x if x == "Utility Laying" else f"{x}"
-    )
+    # Derive the grouping column on a projection so the cached sheet stays untouched
+    filtered_data = filtered_data.assign(**{"Grouped Task": filtered_data["Task Group"].astype(str)})
     
     # Configure Ag-Grid
     gb = GridOptionsBuilder.from_dataframe(filtered_data)
@@ -118,11 +131,18 @@ def main():
     gb.configure_column("Progress (%)", hide=True)
     gb.configure_grid_options(domLayout='autoHeight')
     
-    AgGrid(filtered_data, gridOptions=gb.build(), custom_css=custom_css, enable_enterprise_modules=True, height=600, theme="alpine")
+    with stage("Utility.aggrid"):
+        AgGrid(filtered_data, gridOptions=gb.build(), custom_css=custom_css, enable_enterprise_modules=True, height=600, theme="alpine")
+    record_payload("Utility.aggrid", filtered_data)
+
+def main():    
+    sheets = st.session_state.sheets
+    work_breakdown(sheets["Corridor Work"])
 
 
 if __name__ == "__main__":
-    main()
+    with stage("page.Utility"):
+        main()
     
 footer_css = """
     <style>
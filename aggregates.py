@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# Stop the actual work progress curve at 8th March
+SCURVE_CUTOFF = pd.Timestamp("2025-03-08")
+
+TARGET_COLUMNS = ["Planned", "Actual"]
+
+
+def _completion(planned, actual):
+    return (actual / planned) * 100
+
+
+def corridor_summary(df):
+    """Planned/Actual totals for the East side, West side and the whole station"""
+    east_work = df.loc[df["Corridor"] == "East", TARGET_COLUMNS].sum()
+    west_work = df.loc[df["Corridor"] == "West", TARGET_COLUMNS].sum()
+    total_work = df[TARGET_COLUMNS].sum()
+
+    summary_df = pd.DataFrame({
+        "Category": ["East Side", "West Side", "Total Work"],
+        "Planned": [east_work["Planned"], west_work["Planned"], total_work["Planned"]],
+        "Actual": [east_work["Actual"], west_work["Actual"], total_work["Actual"]]
+    })
+    return summary_df.assign(**{"Actual %": _completion(summary_df["Planned"], summary_df["Actual"])})
+
+
+def identifier_summary(df):
+    """Planned/Actual totals per Identifier (main road, secondary road) and corridor"""
+    road_summary = df.groupby(["Identifier", "Corridor"])[TARGET_COLUMNS].sum().reset_index()
+    return road_summary.assign(**{"Actual %": _completion(road_summary["Planned"], road_summary["Actual"])})
+
+
+def agency_completion(df):
+    """Utility Laying completion per corridor, agency and size, with chart labels"""
+    df_utility = df[df["Task Group"].str.lower() == "utility laying"]
+
+    grouped = df_utility.groupby(["Corridor", "Work Breakdown", "Size"], as_index=False).agg({
+        "Planned": "sum",
+        "Actual": "sum"
+    })
+
+    # Append the Size to the label only where an agency has several sizes in the same corridor
+    sizes_per_agency = grouped.groupby(["Corridor", "Work Breakdown"])["Size"].transform("size")
+    labels = np.where(
+        sizes_per_agency > 1,
+        grouped["Work Breakdown"] + " (" + grouped["Size"].astype(str) + ")",
+        grouped["Work Breakdown"],
+    )
+    return grouped.assign(**{
+        "Completion (%)": _completion(grouped["Planned"], grouped["Actual"]),
+        "Label": labels,
+    })
+
+
+def civil_work_completion(df):
+    """Excavation and Road Reinstatement completion per breakdown plus a Combined row per task group"""
+    df_filtered = df[df["Task Group"].isin(["Excavation", "Road Reinstatement"])]
+
+    df_grouped = (
+        df_filtered.groupby(["Corridor", "Task Group", "Work Breakdown"], as_index=False, sort=False)
+        .agg({"Planned": "sum", "Actual": "sum"})
+    )
+    df_grouped["Completion (%)"] = _completion(df_grouped["Planned"], df_grouped["Actual"])
+
+    # For each (Corridor, Task Group) combination, compute the overall (combined) Planned and Actual.
+    combined = (
+        df_grouped.groupby(["Corridor", "Task Group"], as_index=False)
+        .agg({"Planned": "sum", "Actual": "sum"})
+    )
+    combined["Work Breakdown"] = "Combined"
+    combined["Completion (%)"] = _completion(combined["Planned"], combined["Actual"])
+
+    return pd.concat([df_grouped, combined], ignore_index=True)
+
+
+def scurve_series(df, cutoff_date=SCURVE_CUTOFF):
+    """Baseline/Actual progress with Actual blanked after the last reported date"""
+    return df.assign(Actual=df["Actual"].mask(df["Date"] > cutoff_date))
+
+
+def aligned_scurves(progress_by_station, cutoff_date=SCURVE_CUTOFF, freq="D"):
+    """Baseline/Actual of several stations on one common date index.
+
+    Columns are (series, station). Each station is interpolated only inside its
+    own reported span, so stations never extend past their first or last reading.
+    """
+    if not progress_by_station:
+        return pd.DataFrame()
+    long = pd.concat(
+        {station: scurve_series(df, cutoff_date).set_index("Date")[["Baseline", "Actual"]]
+         for station, df in progress_by_station.items()},
+        names=["Station", "Date"],
+    )
+    wide = long.groupby(level=["Station", "Date"]).last().unstack("Station")
+    index = pd.date_range(wide.index.min(), wide.index.max(), freq=freq)
+    return (
+        wide.reindex(wide.index.union(index))
+        .interpolate(method="time", limit_area="inside")
+        .reindex(index)
+        .rename_axis("Date")
+    )
+
+
+# Per-station aggregates by name, served by the API and precomputed into the data bundle
+STATION_AGGREGATES = {
+    "corridors": lambda sheets: corridor_summary(sheets["Corridor Work"]),
+    "identifiers": lambda sheets: identifier_summary(sheets["Corridor Work"]),
+    "agencies": lambda sheets: agency_completion(sheets["Corridor Work"]),
+    "civil-work": lambda sheets: civil_work_completion(sheets["Corridor Work"]),
+    "s-curve": lambda sheets: scurve_series(sheets["Progress"]),
+}
@@ -0,0 +1,155 @@
+"""Read-only JSON API over the station aggregates shown on the Plotting page.
+
+Run next to the Streamlit app with::
+
+    uvicorn api:app --host 0.0.0.0 --port 8502
+
+Every response carries an ETag; clients polling with If-None-Match get an
+empty 304 until the underlying workbook changes. Every station response is
+built in the background at startup; /ready answers 503 until that is done.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from urllib.parse import unquote
+
+import profiling
+from aggregates import STATION_AGGREGATES as SECTIONS
+from data_store import STATION_FILES, station_aggregate, station_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def _slug(name):
+    return name.lower().replace(" ", "-")
+
+
+STATIONS = {_slug(name): name for name in STATION_FILES}
+
+# path -> (data version, etag, body); a hit costs one stat() and a dict lookup
+_responses = {}
+_warm = threading.Event()
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def _station_payload(station, sections):
+    path = STATION_FILES[station]
+    return {
+        "station": station,
+        **{section: _records(station_aggregate(path, section)) for section in sections},
+    }
+
+
+def _resolve(parts):
+    """Map a request path to (data version, builder) or None for unknown paths"""
+    if parts == ["stations"]:
+        def build():
+            return [
+                {"station": station, "slug": _slug(station), "url": f"/stations/{_slug(station)}"}
+                for station, _, _ in station_fingerprint()
+            ]
+        return station_fingerprint(), build
+
+    if len(parts) in (2, 3) and parts[0] == "stations" and parts[1] in STATIONS:
+        station = STATIONS[parts[1]]
+        path = STATION_FILES[station]
+        if not os.path.exists(path):
+            return None
+        sections = list(SECTIONS) if len(parts) == 2 else [parts[2]]
+        if not set(sections) <= set(SECTIONS):
+            return None
+        return os.path.getmtime(path), lambda: _station_payload(station, sections)
+
+    return None
+
+
+def _response(path):
+    """(etag, body) for a request path, rebuilt only when its data version changed; None if unknown"""
+    resolved = _resolve(path.split("/"))
+    if resolved is None:
+        return None
+    version, build = resolved
+
+    cached = _responses.get(path)
+    if cached is None or cached[0] != version:
+        body = json.dumps(build(), separators=(",", ":")).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        cached = _responses[path] = (version, etag, body)
+    return cached[1:]
+
+
+def _warm_responses():
+    try:
+        for path in ["stations", *(f"stations/{slug}" for slug in STATIONS)]:
+            try:
+                _response(path)
+            except Exception:
+                logger.exception("warm-up of %s failed", path)
+    finally:
+        _warm.set()
+
+
+async def _send(send, status, body=b"", headers=(), content_type=b"application/json"):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _etag_matches(if_none_match, etag):
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                threading.Thread(target=_warm_responses, name="api-warmup", daemon=True).start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+    if scope["method"] not in ("GET", "HEAD"):
+        await _send(send, 405, b'{"error": "method not allowed"}', [(b"allow", b"GET, HEAD")])
+        return
+
+    path = unquote(scope["path"]).strip("/")
+    if path == "metrics":
+        await _send(send, 200, profiling.prometheus_text().encode(), content_type=b"text/plain; version=0.0.4")
+        return
+
+    if path == "ready":
+        if _warm.is_set():
+            await _send(send, 200, b'{"ready": true}')
+        else:
+            await _send(send, 503, b'{"ready": false}')
+        return
+
+    response = await asyncio.to_thread(_response, path)
+    if response is None:
+        await _send(send, 404, b'{"error": "not found"}')
+        return
+    etag, body = response
+
+    headers = [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+    request_headers = dict(scope["headers"])
+    if_none_match = request_headers.get(b"if-none-match", b"").decode()
+    if if_none_match and _etag_matches(if_none_match, etag):
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    await _send(send, 200, b"" if scope["method"] == "HEAD" else body, headers)
@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+import ipaddress
+import os
+import sys
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# scrypt work factors: ~50 ms and 16 MB per check, so every attempt that reaches
+# the hash is expensive and must first get past the rate limiter below.
+SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1}
+
+# Per-client bucket: a burst of 5 attempts, then one more every 20 seconds
+CLIENT_CAPACITY = 5
+CLIENT_REFILL_SECONDS = 20
+# Whole-server bucket that bounds hashing CPU when many clients attack at once
+GLOBAL_CAPACITY = 20
+GLOBAL_REFILL_SECONDS = 0.5
+# Lockout of a session after consecutive failures doubles each time, capped at
+# 15 minutes. Address and global buckets only throttle: locking out an address
+# would lock out everyone behind the same proxy or NAT.
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 900
+# Forget idle clients once this many are tracked
+MAX_TRACKED_KEYS = 10000
+# Reverse proxies in front of the app that append to X-Forwarded-For. When the
+# direct peer is one of UTILITY_PROXY_ADDRESSES (addresses or networks, comma
+# separated; loopback by default), the client address is the entry the
+# outermost of them added, as any entry to its left was sent by the client and
+# can be forged. 0 ignores the header.
+TRUSTED_PROXIES = int(os.environ.get("UTILITY_TRUSTED_PROXIES", 1))
+PROXY_NETWORKS = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.environ.get("UTILITY_PROXY_ADDRESSES", "127.0.0.0/8,::1").split(",")
+    if network.strip()
+]
+
+
+def hash_passcode(passcode, salt=None):
+    """Return ``scrypt$<salt hex>$<hash hex>`` for storing in secrets.toml"""
+    salt = os.urandom(16) if salt is None else salt
+    digest = hashlib.scrypt(passcode.encode(), salt=salt, **SCRYPT_PARAMS)
+    return f"scrypt${salt.hex()}${digest.hex()}"
+
+
+def _matches(passcode, stored):
+    _, salt, expected = stored.split("$")
+    digest = hashlib.scrypt(passcode.encode(), salt=bytes.fromhex(salt), **SCRYPT_PARAMS)
+    return hmac.compare_digest(digest, bytes.fromhex(expected))
+
+
+@st.cache_resource(show_spinner=False)
+def _stored_hash():
+    passwords = st.secrets["passwords"]
+    if "my_pass_hash" in passwords:
+        return passwords["my_pass_hash"]
+    # Legacy plaintext secret: hash it once per process so it is never compared directly
+    return hash_passcode(passwords["my_pass"])
+
+
+class RateLimiter:
+    """Token buckets with exponential backoff, shared by every session of the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}   # key -> (tokens, last refill time)
+        self._failures = {}  # key -> (consecutive failures, blocked until)
+
+    def _refill(self, key, capacity, refill_seconds, now):
+        tokens, last = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - last) / refill_seconds)
+
+    def _prune(self, now):
+        idle = now - CLIENT_CAPACITY * CLIENT_REFILL_SECONDS
+        self._buckets = {key: value for key, value in self._buckets.items() if value[1] > idle}
+        self._failures = {key: value for key, value in self._failures.items() if value[1] > now}
+
+    def acquire(self, keys):
+        """Consume one attempt for every key; returns seconds to wait, 0 if allowed"""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > MAX_TRACKED_KEYS:
+                self._prune(now)
+            blocked = max((self._failures.get(key, (0, 0))[1] - now for key in keys), default=0)
+            if blocked > 0:
+                return blocked
+            # Refuse without consuming anything unless every bucket has a token
+            buckets = [(key, CLIENT_CAPACITY, CLIENT_REFILL_SECONDS) for key in keys]
+            buckets.append(("global", GLOBAL_CAPACITY, GLOBAL_REFILL_SECONDS))
+            levels = [self._refill(key, capacity, refill_seconds, now) for key, capacity, refill_seconds in buckets]
+            wait = max(
+                ((1 - level) * refill_seconds for level, (_, _, refill_seconds) in zip(levels, buckets) if level < 1),
+                default=0,
+            )
+            for level, (key, _, _) in zip(levels, buckets):
+                self._buckets[key] = (level if wait else level - 1, now)
+            return wait
+
+    def record(self, key, success):
+        """Reset or extend the lockout of one key after an attempt"""
+        now = time.monotonic()
+        with self._lock:
+            if success:
+                self._failures.pop(key, None)
+                return
+            failures = self._failures.get(key, (0, 0))[0] + 1
+            delay = min(BACKOFF_BASE_SECONDS * 2 ** (failures - 1), BACKOFF_MAX_SECONDS)
+            self._failures[key] = (failures, now + delay)
+
+
+@st.cache_resource(show_spinner=False)
+def _rate_limiter():
+    return RateLimiter()
+
+
+def _is_proxy(address):
+    # Streamlit reports no address for loopback peers
+    if not address:
+        return any(network.is_loopback for network in PROXY_NETWORKS)
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in PROXY_NETWORKS)
+
+
+def client_keys():
+    """Rate-limit keys for the current browser session and its client address; the session key comes first"""
+    ctx = get_script_run_ctx()
+    keys = [f"session:{ctx.session_id if ctx else 'unknown'}"]
+    ip_address = getattr(st.context, "ip_address", None)
+    forwarded = [hop.strip() for hop in st.context.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+    if TRUSTED_PROXIES and forwarded and _is_proxy(ip_address):
+        ip_address = forwarded[-min(TRUSTED_PROXIES, len(forwarded))]
+    if ip_address:
+        keys.append(f"ip:{ip_address}")
+    return keys
+
+
+def check_passcode(passcode):
+    """Verify a passcode for the current client.
+
+    Returns ``(ok, retry_after)``; ``retry_after`` is non-zero when the attempt
+    was refused by the rate limiter without hashing the passcode.
+    """
+    keys = client_keys()
+    limiter = _rate_limiter()
+    retry_after = limiter.acquire(keys)
+    if retry_after:
+        return False, retry_after
+
+    ok = _matches(passcode, _stored_hash())
+    limiter.record(keys[0], ok)
+    return ok, 0
+
+
+if __name__ == "__main__":
+    # Usage: python auth.py <passcode>  ->  value for [passwords] my_pass_hash
+    print(hash_passcode(sys.argv[1]))
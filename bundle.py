@@ -0,0 +1,127 @@
+"""Read side of the data bundle written by ``python data_processing.py``.
+
+<bundle>/current names the published version; its manifest lists, per source
+file, the mtime it was built from and the files made from it. Every lookup
+returns None unless the source is still unchanged on disk and passed
+validation, so callers fall back to parsing the file themselves.
+
+Sheets and aggregates are uncompressed Arrow IPC files that every process
+memory-maps instead of reading: numeric and date columns stay views of the
+shared page cache. Replicas on one host share a single copy of the data, and
+with UTILITY_BUNDLE_DIR on a tmpfs such as /dev/shm it never touches disk.
+Publishing swaps the current pointer atomically; each process notices the new
+version stamp on its next lookup and drops its maps of the old one.
+"""
+import functools
+import json
+import os
+
+import pyarrow as pa
+import plotly.io as pio
+
+BUNDLE_DIR = os.environ.get("UTILITY_BUNDLE_DIR", os.path.join("data", "bundle"))
+CURRENT_PATH = os.path.join(BUNDLE_DIR, "current")
+
+
+@functools.lru_cache(maxsize=1)
+def _load(pointer_mtime):
+    # A new version stamp: release the memory maps and figures of the previous version
+    _table.cache_clear()
+    _frame.cache_clear()
+    _figure.cache_clear()
+    with open(CURRENT_PATH) as f:
+        version_dir = os.path.join(BUNDLE_DIR, f.read().strip())
+    with open(os.path.join(version_dir, "manifest.json")) as f:
+        return version_dir, json.load(f)
+
+
+def current():
+    """(version directory, manifest) of the published bundle, or (None, None)"""
+    try:
+        return _load(os.path.getmtime(CURRENT_PATH))
+    except FileNotFoundError:
+        return None, None
+
+
+@functools.lru_cache(maxsize=128)
+def _table(path):
+    # Bundle files are immutable, so a table can be shared for the life of its version
+    source = pa.memory_map(path)
+    table = pa.ipc.open_file(source).read_all()
+    source.close()  # the table's buffers keep the mapping alive
+    return table
+
+
+@functools.lru_cache(maxsize=128)
+def _frame(path):
+    return _table(path).to_pandas(split_blocks=True)
+
+
+def write_frame(df, path):
+    """Write a frame in the bundle's memory-mappable format (used by the ingest CLI)"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _entry(source_path, mtime=None):
+    version_dir, manifest = current()
+    if manifest is None:
+        return None, None
+    entry = manifest["sources"].get(source_path)
+    if entry is None or entry["errors"]:
+        return None, None
+    if mtime is None:
+        try:
+            mtime = os.path.getmtime(source_path)
+        except FileNotFoundError:
+            return None, None
+    if entry["mtime"] != mtime:
+        return None, None
+    return version_dir, entry
+
+
+def sheet_names(source_path, mtime=None):
+    """Names of the sheets the ingest CLI wrote for a workbook, in workbook order"""
+    version_dir, entry = _entry(source_path, mtime)
+    if entry is None:
+        return None
+    return list(entry["sheets"])
+
+
+def sheet(source_path, name, mtime=None):
+    """One sheet of a workbook, as written by the ingest CLI"""
+    version_dir, entry = _entry(source_path, mtime)
+    if entry is None or name not in entry["sheets"]:
+        return None
+    return _frame(os.path.join(version_dir, entry["sheets"][name]))
+
+
+def sheet_table(source_path, name, mtime=None):
+    """One sheet as the memory-mapped Arrow table itself, for engines that scan Arrow directly"""
+    version_dir, entry = _entry(source_path, mtime)
+    if entry is None or name not in entry["sheets"]:
+        return None
+    return _table(os.path.join(version_dir, entry["sheets"][name]))
+
+
+def aggregate(source_path, name):
+    """One precomputed aggregate (see aggregates.STATION_AGGREGATES) of a station workbook"""
+    version_dir, entry = _entry(source_path)
+    if entry is None or name not in entry.get("aggregates", {}):
+        return None
+    return _frame(os.path.join(version_dir, entry["aggregates"][name]))
+
+
+def figure(source_path, name):
+    """A precomputed Plotly figure of a station workbook"""
+    version_dir, entry = _entry(source_path)
+    if entry is None or name not in entry.get("figures", {}):
+        return None
+    return _figure(os.path.join(version_dir, entry["figures"][name]))
+
+
+@functools.lru_cache(maxsize=32)
+def _figure(path):
+    # Shared like the frames: renderers only read it
+    return pio.read_json(path)
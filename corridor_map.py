@@ -0,0 +1,198 @@
+"""Corridor progress map: corridor lines and station boxes coloured by completion.
+
+The drawings carry no corridor attributes, so every line of a station's
+corridor layer is drawn and coloured by the station's Total Work completion,
+like its station box. The lines of every corridor and station-box layer are
+written once, to one binary file under static/geometry/ that Streamlit's static file
+server serves. Coordinates are quantized to 16 bits over the bounds of all
+layers, which is a few centimetres at this scale. The file name is a hash of
+its bytes. The browser fetches it with cache "force-cache", so a re-render
+reads it from the browser cache. Each render sends only the completion of
+every group of lines: a station's corridor layer and its station box.
+
+Layout, little-endian:
+- uint32 magic "UCG1", part count P, point count N, group count G;
+- float64 min lon, min lat, max lon, max lat;
+- uint32 points per part [P];
+- uint16 x, y per point [2N];
+- uint8 group of each part [P].
+"""
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+
+import geometry
+from data_store import STATION_FILES, station_aggregate
+
+GEOMETRY_DIR = os.path.join("static", "geometry")
+MAGIC = b"UCG1"
+QUANTIZE = 65535
+
+# Station outline layer of each station that has one; corridors are geometry.GEOMETRY_FILES
+STATION_BOXES = {
+    "Badda": os.path.join("data", "s06_stationBox.geojson"),
+    "North Badda": os.path.join("data", "s07_stationBox.geojson"),
+}
+
+_lock = threading.Lock()
+
+
+def groups():
+    """(station, kind) of every line group on the map; kind is "Corridors" or "Station" for the box"""
+    result = []
+    for station in STATION_FILES:
+        if os.path.exists(geometry.GEOMETRY_FILES.get(station, "")):
+            result.append((station, "Corridors"))
+        if os.path.exists(STATION_BOXES.get(station, "")):
+            result.append((station, "Station"))
+    return result
+
+
+def _layer_path(station, kind):
+    return STATION_BOXES[station] if kind == "Station" else geometry.GEOMETRY_FILES[station]
+
+
+def encode(layer_groups):
+    """The binary geometry of the given groups"""
+    parts, part_groups = [], []
+    for index, (station, kind) in enumerate(layer_groups):
+        for _, _, part in geometry.line_parts(_layer_path(station, kind)):
+            parts.append(np.array([point[:2] for point in part], dtype=float))
+            part_groups.append(index)
+
+    points = np.concatenate(parts) if parts else np.empty((0, 2))
+    low = points.min(axis=0) if len(points) else np.zeros(2)
+    high = points.max(axis=0) if len(points) else np.ones(2)
+    span = np.where(high > low, high - low, 1.0)
+    quantized = np.rint((points - low) / span * QUANTIZE).astype("<u2")
+
+    return b"".join([
+        MAGIC,
+        np.array([len(parts), len(points), len(layer_groups)], dtype="<u4").tobytes(),
+        np.concatenate([low, high]).astype("<f8").tobytes(),
+        np.array([len(part) for part in parts], dtype="<u4").tobytes(),
+        quantized.tobytes(),
+        np.array(part_groups, dtype="u1").tobytes(),
+    ])
+
+
+@functools.lru_cache(maxsize=4)
+def _geometry_file(version):
+    data = encode([(station, kind) for station, kind, _ in version])
+    name = hashlib.sha1(data).hexdigest()[:16] + ".bin"
+    path = os.path.join(GEOMETRY_DIR, name)
+    with _lock:
+        if not os.path.exists(path):
+            os.makedirs(GEOMETRY_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=GEOMETRY_DIR, suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+    return name
+
+
+def geometry_url():
+    """Absolute URL path of the current binary geometry, written on first use"""
+    # A layer changing on disk gives the file a new name, so browsers never keep a stale copy
+    version = tuple((station, kind, os.path.getmtime(_layer_path(station, kind))) for station, kind in groups())
+    base = st.get_option("server.baseUrlPath").strip("/")
+    return "/" + "/".join(filter(None, [base, "app", "static", "geometry", _geometry_file(version)]))
+
+
+def progress():
+    """Total Work completion % of the station of every group, in groups() order; None where nothing is planned"""
+    values = []
+    for station, _ in groups():
+        summary = station_aggregate(STATION_FILES[station], "corridors").set_index("Category")["Actual %"]
+        value = summary.get("Total Work")
+        values.append(None if value is None or not np.isfinite(value) else round(float(value), 1))
+    return values
+
+
+_TEMPLATE = """
+<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css"/>
+<script src="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js"></script>
+<style>
+  html, body, #map { height: 100%; margin: 0; }
+  .legend { background: white; padding: 6px 8px; border-radius: 4px; font: 12px sans-serif; }
+  .legend .bar { width: 140px; height: 10px; background: linear-gradient(to right, #d73027, #fee08b, #1a9850); }
+</style>
+<div id="map"></div>
+<script>
+const config = __CONFIG__;
+const map = L.map("map", {preferCanvas: true});
+L.tileLayer("https://tile.openstreetmap.org/{z}/{x}/{y}.png", {
+  maxZoom: 20, maxNativeZoom: 19, attribution: "&copy; OpenStreetMap contributors",
+}).addTo(map);
+
+const STOPS = [[0, [215, 48, 39]], [50, [254, 224, 139]], [100, [26, 152, 80]]];
+function colour(value) {
+  if (value === null) return "#9e9e9e";
+  const v = Math.max(0, Math.min(100, value));
+  const i = v <= 50 ? 0 : 1;
+  const [v0, c0] = STOPS[i], [v1, c1] = STOPS[i + 1];
+  const t = (v - v0) / (v1 - v0);
+  return "rgb(" + c0.map((c, k) => Math.round(c + t * (c1[k] - c))).join(",") + ")";
+}
+
+const legend = L.control({position: "bottomright"});
+legend.onAdd = () => {
+  const div = L.DomUtil.create("div", "legend");
+  div.innerHTML = "<b>Completion</b><div class='bar'></div>0%<span style='float:right'>100%</span>";
+  return div;
+};
+legend.addTo(map);
+
+fetch(config.url, {cache: "force-cache"}).then(response => response.arrayBuffer()).then(buffer => {
+  const head = new Uint32Array(buffer, 0, 4);
+  const parts = head[1], points = head[2];
+  const [minLon, minLat, maxLon, maxLat] = new Float64Array(buffer, 16, 4);
+  const sizes = new Uint32Array(buffer, 48, parts);
+  const coords = new Uint16Array(buffer, 48 + 4 * parts, 2 * points);
+  const group = new Uint8Array(buffer, 48 + 4 * parts + 4 * points, parts);
+  const dx = (maxLon - minLon) / __QUANTIZE__, dy = (maxLat - minLat) / __QUANTIZE__;
+
+  const lines = config.groups.map(() => []);
+  for (let p = 0, k = 0; p < parts; p++) {
+    const line = new Array(sizes[p]);
+    for (let i = 0; i < sizes[p]; i++, k++) {
+      line[i] = [minLat + coords[2 * k + 1] * dy, minLon + coords[2 * k] * dx];
+    }
+    lines[group[p]].push(line);
+  }
+
+  const all = L.latLngBounds([[minLat, minLon], [maxLat, maxLon]]);
+  const selected = L.latLngBounds([]);
+  config.groups.forEach(([station, kind], i) => {
+    if (!lines[i].length) return;
+    const value = config.progress[i];
+    const box = kind === "Station";
+    const layer = L.polyline(lines[i], {
+      color: colour(value), weight: box ? 2 : 5, opacity: 0.9, dashArray: box ? "6 4" : null,
+    }).bindTooltip(
+      station + " · " + (box ? "Station" : "Corridors") + ": " + (value === null ? "n/a" : value.toFixed(1) + "%"),
+      {sticky: true},
+    ).addTo(map);
+    if (station === config.station) selected.extend(layer.getBounds());
+  });
+  map.fitBounds(selected.isValid() ? selected : all, {padding: [20, 20]});
+});
+</script>
+"""
+
+
+def render(station, height=480):
+    """Draw the map, framed on ``station`` when it has drawings"""
+    config = {"url": geometry_url(), "groups": groups(), "progress": progress(), "station": station}
+    html = _TEMPLATE.replace("__CONFIG__", json.dumps(config)).replace("__QUANTIZE__", str(QUANTIZE))
+    if not any(name == station for name, _ in config["groups"]):
+        st.caption(f"There are no corridor drawings for {station}; the map shows every station that has them.")
+    components.html(html, height=height)
+    return html
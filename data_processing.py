@@ -0,0 +1,374 @@
+"""Offline ingest: validate every data file and publish a versioned data bundle.
+
+    python data_processing.py                 # all stations, data/progress.xlsx, data/*.geojson
+    python data_processing.py --workers 4 --keep 5 --strict
+
+Each workbook and GeoJSON file is parsed and validated in its own worker
+process. Station workbooks also get their aggregates and the S-curve figure
+precomputed, and their Planned corridor lengths are checked against the
+as-designed drawings (see geometry.py). Sheets and aggregates are written as
+Arrow IPC, figures as Plotly JSON, into data/bundle/<version>/ (or
+$UTILITY_BUNDLE_DIR) next to a manifest. data/bundle/current is switched to
+the new version only once it is complete. Photos are added to the
+image store with their renditions and to the photo index, and plan drawings
+are tiled; both stores lock their files, so this can run next to the app.
+
+The app reads from the bundle (see bundle.py) whenever a source file is
+unchanged since it was ingested, and parses the file itself otherwise.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+import geometry
+import image_store
+import photo_index
+import tiles
+from aggregates import STATION_AGGREGATES
+from bundle import BUNDLE_DIR, CURRENT_PATH, write_frame
+from data_store import EXCEL_ENGINE, STATION_FILES
+from plot_sCurve import sCurveFigure
+from snapshots import list_snapshots, load_snapshot, snapshot_frame, write_snapshot
+
+PROGRESS_FILE = os.path.join("data", "progress.xlsx")
+GEOJSON_GLOB = os.path.join("data", "*.geojson")
+IMAGE_FOLDER = "images"
+
+REQUIRED_COLUMNS = {
+    "Corridor Work": ["Corridor", "Section", "Identifier", "Task Group", "Work Breakdown", "Size", "Planned", "Actual"],
+    "Progress": ["Date", "Baseline", "Actual"],
+}
+PROGRESS_COLUMNS = ["Station Name", "Baseline Progress", "Work Progress", "Contract Package"]
+CORRIDORS = {"East", "West"}
+
+
+def _slug(name):
+    return "".join(c if c.isalnum() else "-" for c in name.lower()).strip("-")
+
+
+def _report(source, kind):
+    return {"source": source, "kind": kind, "rows": 0, "seconds": 0.0, "errors": [], "warnings": [],
+            "sheets": {}, "aggregates": {}, "figures": {}}
+
+
+def _write_sheets(report, sheets, out_dir, prefix):
+    for name, df in sheets.items():
+        rel = os.path.join("sheets", prefix, _slug(name) + ".arrow")
+        os.makedirs(os.path.join(out_dir, os.path.dirname(rel)), exist_ok=True)
+        write_frame(df, os.path.join(out_dir, rel))
+        report["sheets"][name] = rel
+        report["rows"] += len(df)
+
+
+def _check_columns(report, sheets, required):
+    for sheet, columns in required.items():
+        if sheet not in sheets:
+            report["errors"].append(f"missing sheet '{sheet}'")
+            continue
+        missing = [column for column in columns if column not in sheets[sheet].columns]
+        if missing:
+            report["errors"].append(f"'{sheet}' is missing columns {missing}")
+
+
+def _validate_station(report, sheets):
+    _check_columns(report, sheets, REQUIRED_COLUMNS)
+    if report["errors"]:
+        return
+
+    work = sheets["Corridor Work"]
+    for column in ("Planned", "Actual"):
+        values = pd.to_numeric(work[column], errors="coerce")
+        if values.isna().any():
+            report["errors"].append(f"Corridor Work '{column}' has {values.isna().sum()} non-numeric rows")
+        if (values < 0).any():
+            report["errors"].append(f"Corridor Work '{column}' has negative values")
+    over = (pd.to_numeric(work["Actual"], errors="coerce") > pd.to_numeric(work["Planned"], errors="coerce")).sum()
+    if over:
+        report["warnings"].append(f"{over} Corridor Work rows report more Actual than Planned")
+    unknown = set(work["Corridor"].dropna()) - CORRIDORS
+    if unknown:
+        report["warnings"].append(f"unknown corridors {sorted(unknown)}")
+
+    progress = sheets["Progress"]
+    dates = pd.to_datetime(progress["Date"], errors="coerce")
+    if dates.isna().any():
+        report["errors"].append(f"Progress has {dates.isna().sum()} rows without a valid Date")
+    elif not dates.is_monotonic_increasing or dates.duplicated().any():
+        report["warnings"].append("Progress dates are not strictly increasing")
+    for column in ("Baseline", "Actual"):
+        values = pd.to_numeric(progress[column], errors="coerce")
+        if ((values < 0) | (values > 100)).any():
+            report["warnings"].append(f"Progress '{column}' leaves the 0-100% range")
+        if (values.dropna().diff() < 0).any():
+            report["warnings"].append(f"Progress '{column}' decreases although it is cumulative")
+
+    if "images" in sheets:
+        missing = [f for f in sheets["images"]["image"] if not os.path.exists(os.path.join(IMAGE_FOLDER, f))]
+        if missing:
+            report["warnings"].append(f"images sheet references missing files {missing}")
+
+
+def _reconcile_lengths(report, work):
+    """Compare Planned corridor lengths with the as-designed drawing of the station"""
+    path = geometry.GEOMETRY_FILES.get(report["station"])
+    if path is None or not os.path.exists(path):
+        return
+    lengths = geometry.reconcile(work, path)
+    report["lengths"] = lengths.to_dict("records")
+    for row in lengths[lengths["mismatch"]].itertuples():
+        report["warnings"].append(
+            f"{row.corridor} corridor: Planned {row.planned_m:,.0f} m but {os.path.basename(path)} "
+            f"draws {row.drawn_m:,.0f} m ({row.difference_m:+,.0f} m)"
+        )
+
+
+def ingest_station(station, path, out_dir):
+    """Worker: parse, validate and precompute one station workbook"""
+    start = time.perf_counter()
+    report = _report(path, "station")
+    report["station"] = station
+    report["mtime"] = os.path.getmtime(path)
+    try:
+        sheets = pd.read_excel(path, sheet_name=None, engine=EXCEL_ENGINE)
+        _validate_station(report, sheets)
+        if not report["errors"]:
+            _reconcile_lengths(report, sheets["Corridor Work"])
+            prefix = _slug(station)
+            _write_sheets(report, sheets, out_dir, prefix)
+            for name, build in STATION_AGGREGATES.items():
+                rel = os.path.join("aggregates", prefix, name + ".arrow")
+                os.makedirs(os.path.join(out_dir, os.path.dirname(rel)), exist_ok=True)
+                write_frame(build(sheets), os.path.join(out_dir, rel))
+                report["aggregates"][name] = rel
+            rel = os.path.join("figures", prefix, "s-curve.json")
+            os.makedirs(os.path.join(out_dir, os.path.dirname(rel)), exist_ok=True)
+            sCurveFigure(sheets["Progress"]).write_json(os.path.join(out_dir, rel))
+            report["figures"]["s-curve"] = rel
+            report["images"] = list(sheets.get("images", {}).get("image", []))
+    except Exception as e:
+        report["errors"].append(f"{type(e).__name__}: {e}")
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def ingest_progress(path, out_dir):
+    """Worker: the station-by-station progress summary shown on the landing page"""
+    start = time.perf_counter()
+    report = _report(path, "progress")
+    report["mtime"] = os.path.getmtime(path)
+    try:
+        sheets = pd.read_excel(path, sheet_name=None, engine=EXCEL_ENGINE)
+        for name, df in sheets.items():
+            _check_columns(report, {name: df}, {name: PROGRESS_COLUMNS})
+            for column in ("Baseline Progress", "Work Progress"):
+                if column in df and ((pd.to_numeric(df[column], errors="coerce") > 1)).any():
+                    report["warnings"].append(f"'{name}' {column} has values above 100%")
+        if not report["errors"]:
+            _write_sheets(report, sheets, out_dir, "progress")
+    except Exception as e:
+        report["errors"].append(f"{type(e).__name__}: {e}")
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def _coordinates(geometry):
+    """Flat list of (lon, lat) pairs of any GeoJSON geometry"""
+    if geometry["type"] == "GeometryCollection":
+        return [point for part in geometry["geometries"] for point in _coordinates(part)]
+    coords = geometry["coordinates"]
+    depth = {"Point": 0, "LineString": 1, "MultiPoint": 1, "Polygon": 2, "MultiLineString": 2, "MultiPolygon": 3}
+    points = [coords]
+    for _ in range(depth[geometry["type"]]):
+        points = [point for part in points for point in part]
+    return points
+
+
+def ingest_geojson(path, out_dir):
+    """Worker: check a GeoJSON layer and copy it into the bundle with its bounds"""
+    start = time.perf_counter()
+    report = _report(path, "geojson")
+    report["mtime"] = os.path.getmtime(path)
+    try:
+        with open(path) as f:
+            layer = json.load(f)
+        features = layer.get("features", []) if layer.get("type") == "FeatureCollection" else []
+        if not features:
+            report["errors"].append("not a FeatureCollection with features")
+        points = [point for feature in features if feature.get("geometry")
+                  for point in _coordinates(feature["geometry"])]
+        report["rows"] = len(features)
+        if any(not (math.isfinite(p[0]) and math.isfinite(p[1]) and -180 <= p[0] <= 180 and -90 <= p[1] <= 90)
+               for p in points):
+            report["errors"].append("coordinates outside the longitude/latitude range")
+        if sum(1 for feature in features if not feature.get("geometry")):
+            report["warnings"].append("features without geometry")
+        if not report["errors"]:
+            lons, lats = [p[0] for p in points], [p[1] for p in points]
+            report["bounds"] = [[min(lats), min(lons)], [max(lats), max(lons)]]
+            rel = os.path.join("geojson", os.path.basename(path))
+            os.makedirs(os.path.join(out_dir, "geojson"), exist_ok=True)
+            shutil.copyfile(path, os.path.join(out_dir, rel))
+            report["sheets"]["layer"] = rel
+    except Exception as e:
+        report["errors"].append(f"{type(e).__name__}: {e}")
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def prepare_images(station_reports, workers):
+    """Store photos with their renditions, tile the plan drawings (first image of each station) and index them all"""
+    start = time.perf_counter()
+    report = _report(IMAGE_FOLDER, "images")
+    plans = {images[0] for images in (r.get("images") for r in station_reports) if images}
+    photos = {f for r in station_reports for f in r.get("images", [])}
+
+    def prepare(name):
+        path = os.path.join(IMAGE_FOLDER, name)
+        digest = image_store.put_file(path)
+        if name in plans:
+            tiles.pyramid(digest)
+        else:
+            image_store.rendition(digest, "grid")
+            image_store.rendition(digest, "thumb")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {pool.submit(prepare, name): name for name in sorted(photos)
+                if os.path.exists(os.path.join(IMAGE_FOLDER, name))}
+        for job in as_completed(jobs):
+            try:
+                job.result()
+                report["rows"] += 1
+            except Exception as e:
+                report["errors"].append(f"{jobs[job]}: {type(e).__name__}: {e}")
+    try:
+        photo_index.update_index(workers=workers)
+    except Exception as e:
+        report["errors"].append(f"photo index: {type(e).__name__}: {e}")
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def _publish(build_dir, version, keep):
+    version_dir = os.path.join(BUNDLE_DIR, version)
+    os.replace(build_dir, version_dir)
+    tmp_pointer = CURRENT_PATH + ".part"
+    with open(tmp_pointer, "w") as f:
+        f.write(version)
+    os.replace(tmp_pointer, CURRENT_PATH)
+
+    versions = sorted(d for d in os.listdir(BUNDLE_DIR)
+                      if not d.startswith(".") and os.path.isdir(os.path.join(BUNDLE_DIR, d)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(BUNDLE_DIR, old), ignore_errors=True)
+    return version_dir
+
+
+def _print_report(reports, total_seconds):
+    width = max(len(r["source"]) for r in reports)
+    print(f"{'source':<{width}}  {'kind':<8}{'rows':>7}{'seconds':>9}  status")
+    for r in reports:
+        status = "error" if r["errors"] else "warning" if r["warnings"] else "ok"
+        print(f"{r['source']:<{width}}  {r['kind']:<8}{r['rows']:>7}{r['seconds']:>9.2f}  {status}")
+    for r in reports:
+        for message in r["errors"]:
+            print(f"ERROR   {r['source']}: {message}")
+        for message in r["warnings"]:
+            print(f"WARNING {r['source']}: {message}")
+    print(f"\n{len(reports)} sources in {total_seconds:.2f}s")
+
+
+def take_snapshot(reports, build_dir, version, created):
+    """Keep the Corridor Work of every station as an immutable snapshot for diffing.
+
+    A station that failed validation keeps its rows from the previous
+    snapshot, with its source marked ``carried_from`` that version, so the
+    Changes page does not report all of them as removed.
+    """
+    stations = [r for r in reports if r["kind"] == "station" and not r["errors"]]
+    snapshot = snapshot_frame({
+        r["station"]: pd.read_feather(os.path.join(build_dir, r["sheets"]["Corridor Work"])) for r in stations
+    })
+    sources = {r["station"]: {"path": r["source"], "mtime": r["mtime"]} for r in stations}
+
+    previous = list_snapshots()
+    failed = {r["station"] for r in reports if r["kind"] == "station" and r["errors"]}
+    if previous and failed:
+        last = previous[-1]
+        old = load_snapshot(last["version"])
+        carried = sorted(failed & set(old["station"].unique()))
+        carried_rows = [old[old["station"] == station] for station in carried]
+        snapshot = pd.concat([snapshot, *carried_rows], ignore_index=True)
+        for station in carried:
+            source = last["sources"].get(station, {})
+            sources[station] = {**source, "carried_from": source.get("carried_from", last["version"])}
+        # Stations in ingest order, as in a snapshot where none failed
+        order = {r["station"]: i for i, r in enumerate(r for r in reports if r["kind"] == "station")}
+        snapshot = snapshot.sort_values(
+            "station", key=lambda column: column.map(order), kind="stable", ignore_index=True
+        )
+    return write_snapshot(snapshot, version, created, sources)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--keep", type=int, default=3, help="bundle versions to keep on disk")
+    parser.add_argument("--skip-images", action="store_true", help="do not prepare photos and plan tiles")
+    parser.add_argument("--strict", action="store_true", help="do not publish when any source has errors")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    version = datetime.now().strftime("%Y%m%dT%H%M%S")
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    build_dir = os.path.join(BUNDLE_DIR, f".build-{version}")
+    os.makedirs(build_dir)
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            jobs = [pool.submit(ingest_station, station, path, build_dir)
+                    for station, path in STATION_FILES.items() if os.path.exists(path)]
+            if os.path.exists(PROGRESS_FILE):
+                jobs.append(pool.submit(ingest_progress, PROGRESS_FILE, build_dir))
+            jobs += [pool.submit(ingest_geojson, path, build_dir) for path in sorted(glob.glob(GEOJSON_GLOB))]
+            reports = [job.result() for job in jobs]
+
+        if not args.skip_images:
+            reports.append(prepare_images([r for r in reports if r["kind"] == "station"], args.workers))
+
+        failed = any(r["errors"] for r in reports)
+        created = datetime.now().isoformat(timespec="seconds")
+        manifest = {
+            "version": version,
+            "created": created,
+            "sources": {r["source"]: {k: v for k, v in r.items() if k != "source"}
+                        for r in reports if r["kind"] != "images"},
+        }
+        with open(os.path.join(build_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=1, default=str)
+
+        _print_report(reports, time.perf_counter() - started)
+        if failed and args.strict:
+            shutil.rmtree(build_dir)
+            print("Not published: fix the errors above or run without --strict")
+            return 1
+        snapshot_written = take_snapshot(reports, build_dir, version, created)
+        print(f"Published bundle {version} to {_publish(build_dir, version, args.keep)}")
+        print(f"Snapshot {version} saved" if snapshot_written else "Corridor Work unchanged since the last snapshot")
+        return 1 if failed else 0
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
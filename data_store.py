@@ -0,0 +1,142 @@
+import os
+import threading
+from collections.abc import Mapping
+
+import pandas as pd
+import streamlit as st
+
+import bundle
+from aggregates import STATION_AGGREGATES
+from profiling import stage
+
+# pandas >= 3 always uses Copy-on-Write. On older versions opt in, so frames
+# derived from the cached sheets share their buffers until they are written.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# calamine (Rust) parses xlsx several times faster than openpyxl; pandas'
+# openpyxl reader is the fallback and also streams rows in read-only mode
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+
+class Workbook(Mapping):
+    """Read-only sheets of one workbook, each parsed on first access and then kept"""
+
+    def __init__(self, names, read, path=None):
+        self.path = path
+        self._names = list(names)
+        self._read = read
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        frame = self._frames.get(name)
+        if frame is None:
+            if name not in self._names:
+                raise KeyError(name)
+            # Sessions opening the same sheet at once wait for one parse
+            with self._lock:
+                frame = self._frames.get(name)
+                if frame is None:
+                    frame = self._frames[name] = self._read(name)
+        return frame
+
+    def __contains__(self, name):
+        # Mapping's default would parse the sheet just to test membership
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def loaded(self):
+        """The sheets parsed so far, by name"""
+        return dict(self._frames)
+
+    def __repr__(self):
+        return f"Workbook({self._names!r}, loaded={list(self._frames)!r})"
+
+
+class SheetsRef(Mapping):
+    """Stands in for a session's Workbook: looks the sheets up in the shared cache on every access"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __getitem__(self, name):
+        return load_sheets(self.path)[name]
+
+    def __contains__(self, name):
+        return name in load_sheets(self.path)
+
+    def __iter__(self):
+        return iter(load_sheets(self.path))
+
+    def __len__(self):
+        return len(load_sheets(self.path))
+
+    def __repr__(self):
+        return f"SheetsRef({self.path!r})"
+
+
+def _read_sheet(file_path, mtime, name):
+    # Arrow from the ingest bundle when it was built from this exact file
+    with stage("read_bundle"):
+        frame = bundle.sheet(file_path, name, mtime)
+    if frame is None:
+        with stage("read_excel"):
+            frame = pd.read_excel(file_path, sheet_name=name, engine=EXCEL_ENGINE)
+    return frame
+
+
+@st.cache_resource(show_spinner=False)
+def _load_sheets(file_path, mtime):
+    names = bundle.sheet_names(file_path, mtime)
+    if names is None:
+        with pd.ExcelFile(file_path, engine=EXCEL_ENGINE) as workbook:
+            names = workbook.sheet_names
+    return Workbook(names, lambda name: _read_sheet(file_path, mtime, name), file_path)
+
+
+def load_sheets(file_path):
+    """The sheets of a workbook, shared read-only across reruns and sessions.
+
+    Sheets are parsed when first looked up, so a page pays only for the sheets
+    it reads. The returned frames are owned by the cache: renderers must derive
+    display columns with ``df.assign(...)`` instead of writing into them.
+    Replacing the workbook on disk changes its mtime and invalidates the cached
+    entry.
+    """
+    return _load_sheets(file_path, os.path.getmtime(file_path))
+
+
+def station_aggregate(file_path, name):
+    """One of aggregates.STATION_AGGREGATES for a workbook, precomputed by the ingest CLI when current"""
+    frame = bundle.aggregate(file_path, name)
+    return frame if frame is not None else STATION_AGGREGATES[name](load_sheets(file_path))
+
+
+# Every station workbook shipped with the app
+STATION_FILES = {
+    "Rampura": "s04_rampura_progress.xlsx",
+    "Aftab Nagar": "s05_aftab_nagar_progress.xlsx",
+    "Badda": "s06_badda_progress.xlsx",
+    "North Badda": "s07_north_badda_progress.xlsx",
+    "Natun Bazar": "s08_natun_bazar_progress.xlsx",
+    "Nadda": "nadda_progress.xlsx",
+}
+
+
+def station_fingerprint(station_files=STATION_FILES):
+    """(station, path, mtime) for every workbook present on disk, usable as a cache key"""
+    return tuple(
+        (station, path, os.path.getmtime(path))
+        for station, path in station_files.items()
+        if os.path.exists(path)
+    )
@@ -0,0 +1,95 @@
+import sys
+
+import pandas as pd
+import streamlit as st
+
+import profiling
+import session_memory
+from auth import check_passcode
+
+
+def _authenticated():
+    """Ask for the Issue Logs passcode until this session has entered it"""
+    if st.session_state.get("authenticated"):
+        return True
+    passcode = st.text_input("Enter passcode:", type="password")
+    if st.button("Submit"):
+        ok, retry_after = check_passcode(passcode)
+        if ok:
+            st.session_state.authenticated = True
+            st.rerun()
+        elif retry_after:
+            st.error(f"⏳ Too many attempts. Please try again in {retry_after:.0f} seconds.")
+        else:
+            st.error("⚠️ Incorrect passcode. Please try again.")
+    return False
+
+
+def render():
+    """Per-stage render timings; reached through the landing page with ?diagnostics=1"""
+    st.title("🩺 Render Diagnostics")
+    # Sessions, timings and the reset button are for maintainers only
+    if not _authenticated():
+        return
+
+    if not profiling.ENABLED:
+        st.info(
+            "Profiling is off. Start the app with `UTILITY_PROFILE=1` to record stage timings "
+            "and payload sizes, or `UTILITY_PROFILE=alloc` to also trace allocations."
+        )
+
+    if "warmup" in sys.modules:
+        # Only when started through warmup.py
+        status = sys.modules["warmup"].WARMUP.status()
+        if status["ready"]:
+            st.success(f"Caches warmed: {status['total']} tasks in {status['seconds']:.1f} s")
+        elif status["finished"]:
+            st.warning(f"Warm-up finished in {status['seconds']:.1f} s with errors; /ready reports not ready")
+        else:
+            st.warning(f"Warming caches: {status['done']} of {status['total']} tasks done")
+        for error in status["errors"]:
+            st.error(error)
+
+    sessions, totals = session_memory.summary()
+    st.subheader("Sessions")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Active viewers", totals["sessions"])
+    col2.metric("Held by sessions", f"{totals['owned_bytes'] / 2**20:.1f} MB")
+    col3.metric("Shared sheets", f"{totals['shared_bytes'] / 2**20:.1f} MB")
+    col4.metric("Per viewer", f"{totals['bytes_per_viewer'] / 2**20:.1f} MB")
+    if len(sessions):
+        st.dataframe(sessions.sort_values("State (KB)", ascending=False), hide_index=True)
+    st.caption(
+        f"Sessions idle for {session_memory.IDLE_SECONDS:g} s or holding more than "
+        f"{session_memory.MAX_SESSION_BYTES / 2**20:g} MB are swapped out to the shared caches."
+    )
+
+    st.subheader("Stages")
+    stats = profiling.snapshot()
+    if stats:
+        table = pd.DataFrame.from_dict(stats, orient="index").rename_axis("Stage").reset_index()
+        calls = table["calls"].where(table["calls"] > 0)
+        table = table.assign(**{
+            "Mean Wall (ms)": table["wall_seconds"] / calls * 1000,
+            "Max Wall (ms)": table["wall_seconds_max"] * 1000,
+            "Mean CPU (ms)": table["cpu_seconds"] / calls * 1000,
+            "Mean Alloc (KB)": table["alloc_bytes"] / calls / 1024,
+            "Payload (KB)": table["payload_bytes"] / 1024,
+        })
+        columns = ["Stage", "calls", "Mean Wall (ms)", "Max Wall (ms)", "Mean CPU (ms)",
+                   "Mean Alloc (KB)", "Payload (KB)"]
+        st.dataframe(
+            table[columns].rename(columns={"calls": "Calls"}).sort_values("Mean Wall (ms)", ascending=False),
+            hide_index=True,
+        )
+    else:
+        st.write("No stages recorded yet.")
+
+    metrics = profiling.prometheus_text() + session_memory.prometheus_text(totals)
+    with st.expander("Prometheus metrics"):
+        st.code(metrics, language="text")
+    col1, col2 = st.columns(2)
+    col1.download_button("📥 Download metrics", data=metrics, file_name="metrics.txt", mime="text/plain")
+    if col2.button("🧹 Reset counters"):
+        profiling.reset()
+        st.rerun()
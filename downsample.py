@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Point/bar counts above which figures are made lighter for the browser. Override
+# per deployment with UTILITY_WEBGL_POINTS, UTILITY_MAX_POINTS, UTILITY_MAX_LABELED_BARS.
+WEBGL_POINTS = int(os.environ.get("UTILITY_WEBGL_POINTS", 1000))   # line points per figure before WebGL
+MAX_POINTS = int(os.environ.get("UTILITY_MAX_POINTS", 2000))       # line points per trace before LTTB
+MAX_LABELED_BARS = int(os.environ.get("UTILITY_MAX_LABELED_BARS", 60))
+
+# Scattergl only draws the named dash styles
+_GL_DASHES = {"solid", "dot", "dash", "longdash", "dashdot", "longdashdot"}
+
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; of every bucket in between, the
+    point forming the largest triangle with the previous pick and the next
+    bucket's average, which keeps peaks and inflection points of the curve.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ns]").astype(np.int64).astype(float)
+    if values.dtype.kind in "iuf":
+        return values.astype(float)
+    return pd.to_datetime(values).asi8.astype(float)
+
+
+def _downsampled(trace):
+    """The trace's finite points, reduced with LTTB when there are more than MAX_POINTS"""
+    x, y = np.asarray(trace.x), np.asarray(trace.y, dtype=float)
+    finite = np.isfinite(y)
+    x, y = x[finite], y[finite]
+    keep = lttb(_as_float(x), y, MAX_POINTS)
+    return x[keep], y[keep]
+
+
+def fit_figure(fig):
+    """Lighten a figure for the browser when it grows past the configured sizes.
+
+    Line traces above MAX_POINTS are downsampled with LTTB, and the figure
+    switches to WebGL (Scattergl) once its lines hold more than WEBGL_POINTS.
+    Bars have no WebGL equivalent; above MAX_LABELED_BARS their text labels are
+    dropped, which is where most of the SVG cost of a large bar chart goes.
+    """
+    lines = {id(trace) for trace in fig.data if trace.type in ("scatter", "scattergl") and trace.y is not None}
+    line_points = sum(len(trace.y) for trace in fig.data if id(trace) in lines)
+    bar_count = sum(len(trace.x) for trace in fig.data if trace.type == "bar" and trace.x is not None)
+    if line_points <= WEBGL_POINTS and bar_count <= MAX_LABELED_BARS:
+        return fig
+
+    traces = []
+    for trace in fig.data:
+        if id(trace) in lines:
+            x, y = _downsampled(trace)
+            spec = trace.to_plotly_json()
+            spec.update(x=x, y=y)
+            if line_points > WEBGL_POINTS:
+                spec.pop("type")
+                line = spec.get("line", {})
+                if line.get("dash") and line["dash"] not in _GL_DASHES:
+                    line["dash"] = "dash"
+                trace = go.Scattergl(spec, skip_invalid=True)
+            else:
+                trace = type(trace)(spec)
+        elif trace.type == "bar" and bar_count > MAX_LABELED_BARS:
+            trace.update(text=None, texttemplate=None, textposition="none")
+        traces.append(trace)
+    return go.Figure(data=traces, layout=fig.layout)
@@ -0,0 +1,142 @@
+"""Excel export of the Plotting page's summaries for every station in one workbook.
+
+    python export.py summaries.xlsx
+
+Sheets hold the corridor summary, the identifier summary, Utility Laying
+completion by agency, civil work completion and every Corridor Work row, each
+with a Station column. The workbook is streamed with xlsxwriter in
+constant_memory mode: every row goes to disk as soon as it is written, so
+memory stays flat whatever the row count. Formats are created once per
+workbook and applied per column instead of per cell.
+"""
+import argparse
+import io
+import time
+
+import pandas as pd
+import xlsxwriter
+
+from data_store import STATION_FILES, load_sheets, station_aggregate, station_fingerprint
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CHUNK_ROWS = 10_000
+
+# sheet name -> (aggregate name or None for the raw sheet, columns to leave out)
+SHEETS = {
+    "Corridor Summary": ("corridors", []),
+    "By Identifier": ("identifiers", []),
+    "Utility Laying": ("agencies", ["Label"]),
+    "Civil Work": ("civil-work", []),
+    "Corridor Work": (None, []),
+}
+
+
+def summary_tables(station_files=STATION_FILES):
+    """Every export sheet as one frame across the stations present on disk"""
+    tables = {}
+    for sheet, (aggregate, dropped) in SHEETS.items():
+        frames = {
+            station: (station_aggregate(path, aggregate) if aggregate else load_sheets(path)["Corridor Work"])
+            for station, path, _ in station_fingerprint(station_files)
+        }
+        table = pd.concat(frames, names=["Station", None]).reset_index(level=0) if frames else pd.DataFrame()
+        tables[sheet] = table.drop(columns=dropped, errors="ignore").reset_index(drop=True)
+    return tables
+
+
+def _formats(workbook):
+    # One shared format per kind of column; xlsxwriter dedupes them into the styles table once
+    return {
+        "header": workbook.add_format({"bold": True, "bg_color": "#faf0e6", "border": 1, "text_wrap": True}),
+        "integer": workbook.add_format({"num_format": "#,##0"}),
+        "number": workbook.add_format({"num_format": "#,##0.00"}),
+        "percent": workbook.add_format({"num_format": '0.0"%"'}),
+        "date": workbook.add_format({"num_format": "dd-mmm-yyyy"}),
+    }
+
+
+def _column_format(name, series, formats):
+    if "%" in name:
+        return formats["percent"]
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return formats["date"]
+    if pd.api.types.is_integer_dtype(series):
+        return formats["integer"]
+    if pd.api.types.is_float_dtype(series):
+        return formats["number"]
+    return None
+
+
+def _column_writer(worksheet, series):
+    """(write method, values) for one column; typed writes skip xlsxwriter's per-cell type dispatch"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return worksheet.write_datetime, series.dt.to_pydatetime().tolist()
+    if pd.api.types.is_bool_dtype(series):
+        return worksheet.write_boolean, series.tolist()
+    if pd.api.types.is_numeric_dtype(series):
+        return worksheet.write_number, series.tolist()
+    if pd.api.types.is_string_dtype(series) and not pd.api.types.is_object_dtype(series):
+        return worksheet.write_string, series.tolist()
+    # Mixed columns such as Section (1, 2, "S1") keep numbers numeric
+    return worksheet.write, series.tolist()
+
+
+def write_table(worksheet, df, formats):
+    """Header plus rows, top to bottom as constant_memory requires; returns the rows written"""
+    for col, name in enumerate(df.columns):
+        # Cells written without a format take their column's
+        width = max(len(str(name)), 10) + 2
+        worksheet.set_column(col, col, width, _column_format(name, df[name], formats))
+    worksheet.write_row(0, 0, [str(name) for name in df.columns], formats["header"])
+    worksheet.freeze_panes(1, 0)
+    if len(df.columns):
+        worksheet.autofilter(0, 0, max(len(df), 1), len(df.columns) - 1)
+
+    # Python values are made a chunk at a time, so only the frame itself is held in memory
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        columns = [(col, *_column_writer(worksheet, chunk[name]), chunk[name].isna().tolist())
+                   for col, name in enumerate(chunk.columns)]
+        for offset in range(len(chunk)):
+            row = start + offset + 1
+            for col, write, values, missing in columns:
+                # Missing values stay blank; xlsxwriter rejects NaN
+                if not missing[offset]:
+                    write(row, col, values[offset])
+    return len(df)
+
+
+def write_workbook(target, tables):
+    """Stream {sheet name: frame} to a path or binary file object; returns the rows written"""
+    workbook = xlsxwriter.Workbook(target, {
+        "constant_memory": True,
+        "default_date_format": "dd-mmm-yyyy",
+        "strings_to_numbers": False,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+    })
+    formats = _formats(workbook)
+    rows = 0
+    try:
+        for sheet, df in tables.items():
+            rows += write_table(workbook.add_worksheet(sheet[:31]), df, formats)
+    finally:
+        workbook.close()
+    return rows
+
+
+def workbook_bytes(station_files=STATION_FILES):
+    """The export workbook of every station, for a download button"""
+    buffer = io.BytesIO()
+    write_workbook(buffer, summary_tables(station_files))
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="workbook to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = write_workbook(args.output, summary_tables())
+    print(f"{rows} rows written to {args.output} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,22 @@
+"""Advisory locks shared by every process writing the same files.
+
+The image store manifest and the photo index are written both by the running
+app and by the ingest CLI. Each read-modify-replace of them holds an exclusive
+flock() on a lock file next to the data, so writers in different processes
+take turns and each one starts from the other's latest version.
+"""
+import contextlib
+import fcntl
+import os
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """Hold an flock() on ``path`` (created if missing): exclusive, or shared for readers"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,253 @@
+"""Geodesic lengths of the as-designed utility corridors, reconciled against Planned.
+
+The corridor layers hold MultiLineString features without corridor or section
+attributes, so the drawn length is put on a side of the road, West or East of
+a straight axis fitted through all of the station's vertices. A feature that
+lies on one side counts there in full. One that straddles the axis, such as
+an outline around both trenches, is split between the sides segment by
+segment. Features drawn as closed outlines of the trench footprint count half
+their perimeter as corridor length. Parts that repeat another part exactly
+are dropped; the CAD exports contain whole features twice. Two features that
+each run along the other, within PARALLEL_METRES, are the same corridor drawn
+twice, and only the longer one is counted.
+
+Planned corridor length is the Planned of each section's Excavation
+breakdown. The check compares it per corridor, because the drawings cannot
+be split into sections, and flags differences above UTILITY_LENGTH_TOLERANCE
+(a fraction of Planned, default 0.1). When a feature straddles the road the
+split is a guess, so only West and East together are checked.
+"""
+import functools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS = 6371008.8  # mean radius in metres
+TOLERANCE = float(os.environ.get("UTILITY_LENGTH_TOLERANCE", 0.1))
+SIDES = ("West", "East")
+# Two features within this many metres of each other, along this share of
+# each one's length, are two drawings of the same corridor
+PARALLEL_METRES = 3.0
+PARALLEL_SHARE = 0.9
+# Share of a feature's length across the axis above which it straddles the road
+CROSSING_SHARE = 0.25
+
+# As-designed corridor layer of each station that has one
+GEOMETRY_FILES = {
+    "Aftab Nagar": os.path.join("data", "S05.geojson"),
+    "Badda": os.path.join("data", "s06_utilityCorridor.geojson"),
+    "North Badda": os.path.join("data", "s07_utilityCorridor.geojson"),
+}
+
+
+def haversine(lon, lat):
+    """Great-circle length in metres of each segment between consecutive points (degrees)"""
+    lon, lat = np.radians(lon), np.radians(lat)
+    h = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(h))
+
+
+def _line_parts(layer):
+    """(feature index, closed, [[lon, lat, ...], ...]) for every line part, without repeats"""
+    seen = set()
+    for i, feature in enumerate(layer.get("features", [])):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "LineString":
+            parts = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiLineString":
+            parts = geometry["coordinates"]
+        else:
+            continue
+        parts = [part for part in parts if len(part) >= 2]
+        if not parts:
+            continue
+        closed = parts[0][0][:2] == parts[-1][-1][:2]
+        for part in parts:
+            key = tuple(tuple(point[:2]) for point in part)
+            if key not in seen:
+                seen.add(key)
+                yield i, closed, part
+
+
+@functools.lru_cache(maxsize=16)
+def _parts(path, mtime):
+    # Geometry versions are (path, mtime); a layer is read once per version
+    with open(path) as f:
+        layer = json.load(f)
+    return tuple(_line_parts(layer))
+
+
+def line_parts(path):
+    """(feature index, closed, [[lon, lat, ...], ...]) for every distinct line part of a layer"""
+    return _parts(path, os.path.getmtime(path))
+
+
+def _local_metres(points, origin):
+    """East and north offsets in metres of (lon, lat) points from origin; plane enough for one station"""
+    scale = np.radians(1) * EARTH_RADIUS
+    return (points - origin) * scale * np.array([np.cos(np.radians(origin[1])), 1.0])
+
+
+def _distance_to_segments(points, starts, ends):
+    """Distance from each point to the nearest of the segments starts -> ends"""
+    direction = ends - starts
+    norm = np.maximum((direction ** 2).sum(axis=1), 1e-12)
+    t = np.clip(((points[:, None, :] - starts) * direction).sum(axis=2) / norm, 0, 1)
+    nearest = starts + t[..., None] * direction
+    return np.sqrt(((points[:, None, :] - nearest) ** 2).sum(axis=2)).min(axis=1)
+
+
+def _samples(starts, ends):
+    """Points about a metre apart along segments, each with the length it stands for"""
+    lengths = np.hypot(*(ends - starts).T)
+    counts = np.maximum(np.ceil(lengths), 1).astype(np.int64)
+    segment = np.repeat(np.arange(len(starts)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = ((offset + 0.5) / counts[segment])[:, None]
+    return starts[segment] + t * (ends - starts)[segment], (lengths / counts)[segment]
+
+
+@functools.lru_cache(maxsize=16)
+def _features(path, mtime):
+    rows = _parts(path, mtime)
+    features = np.array([feature for feature, _, _ in rows], dtype=np.int64)
+    closed = np.array([is_closed for _, is_closed, _ in rows], dtype=bool)
+    parts = [part for _, _, part in rows]
+    sizes = np.fromiter(map(len, parts), dtype=np.int64, count=len(parts))
+    points = np.array([point[:2] for part in parts for point in part], dtype=float).reshape(-1, 2)
+    columns = ["feature", "side", "length_m", "west_m", "east_m", "crossing", "redraws"]
+    if not len(points):
+        return pd.DataFrame(columns=columns)
+
+    # One pass over all vertices; segments spanning two parts are zeroed out,
+    # and segments of closed outlines count half
+    segments = haversine(points[:, 0], points[:, 1])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    segments[starts[1:] - 1] = 0
+    counted = segments * np.where(np.repeat(closed, sizes)[:-1], 0.5, 1.0)
+    keys, segment_index = np.unique(np.repeat(features, sizes)[:-1], return_inverse=True)
+
+    # Side of the road of every segment against the axis lon = a + b * lat fitted through every vertex
+    if np.ptp(points[:, 1]) > 0:
+        b, a = np.polyfit(points[:, 1], points[:, 0], 1)
+    else:
+        b, a = 0.0, points[:, 0].mean()
+    middles = (points[:-1] + points[1:]) / 2
+    segment_west = middles[:, 0] < a + b * middles[:, 1]
+    west_m = np.bincount(segment_index, counted * segment_west, len(keys))
+    east_m = np.bincount(segment_index, counted * ~segment_west, len(keys))
+    lengths = west_m + east_m
+    west = west_m >= east_m
+    crossing = np.minimum(west_m, east_m) / np.maximum(lengths, 1e-12)
+
+    # Two features each lying along the other, within PARALLEL_METRES for
+    # PARALLEL_SHARE of their lengths, draw the same corridor twice
+    local = _local_metres(points, points.mean(axis=0))
+    real = segments > 0
+    samples = []
+    for i in range(len(keys)):
+        mine = real & (segment_index == i)
+        samples.append((local[:-1][mine], local[1:][mine], *_samples(local[:-1][mine], local[1:][mine])))
+
+    def along(i, j):
+        points_i, weights_i = samples[i][2:]
+        near = _distance_to_segments(points_i, samples[j][0], samples[j][1]) <= PARALLEL_METRES
+        return weights_i[near].sum() >= PARALLEL_SHARE * weights_i.sum()
+
+    redraws = np.full(len(keys), -1, dtype=np.int64)
+    kept = []
+    for i in np.argsort(-lengths, kind="stable"):
+        original = next((j for j in kept if along(i, j) and along(j, i)), None)
+        if original is None:
+            kept.append(i)
+        else:
+            redraws[i] = keys[original]
+
+    return pd.DataFrame({
+        "feature": keys,
+        "side": np.where(west, SIDES[0], SIDES[1]),
+        "length_m": lengths,
+        "west_m": west_m,
+        "east_m": east_m,
+        "crossing": crossing,
+        "redraws": redraws,
+    }, columns=columns)
+
+
+def features(path):
+    """Per feature of a layer: the side most of it lies on, its length in metres
+    in all and per side, the share of it on its other side, and the feature it
+    re-draws (-1 if none)"""
+    return _features(path, os.path.getmtime(path))
+
+
+def _counted(path):
+    """Features counted in the drawn length, and whether every one of them lies on one side"""
+    table = features(path)
+    table = table[table["redraws"] < 0]
+    return table, bool((table["crossing"] <= CROSSING_SHARE).all())
+
+
+def corridor_lengths(path):
+    """Geodesic length in metres of a corridor layer per side of the road.
+
+    A feature lying on one side counts there in full; one that straddles the
+    axis is split between the sides segment by segment.
+    """
+    table, _ = _counted(path)
+    straddles = table["crossing"] > CROSSING_SHARE
+    lengths = {
+        side: table.loc[~straddles & (table["side"] == side), "length_m"].sum()
+        + table.loc[straddles, f"{side.lower()}_m"].sum()
+        for side in SIDES
+    }
+    return pd.Series(lengths, dtype=float).reindex(list(SIDES))
+
+
+def planned_lengths(work):
+    """Planned corridor length per corridor and section of a Corridor Work sheet"""
+    trench = work[(work["Task Group"] == "Excavation") & (work["Work Breakdown"] == "Excavation")]
+    return pd.to_numeric(trench["Planned"], errors="coerce").groupby(
+        [trench["Corridor"], trench["Section"].astype(str)], sort=False
+    ).sum()
+
+
+def reconcile(work, path, tolerance=TOLERANCE):
+    """Planned against drawn length per corridor, with a mismatch flag.
+
+    Corridors the drawings cannot place (anything but West and East) are
+    listed with no drawn length and never flagged. When a counted feature
+    straddles the road, the split between West and East is a guess: those
+    rows are not flagged, and a "West + East" row checks the two together.
+    """
+    planned = planned_lengths(work)
+    drawn = corridor_lengths(path)
+    _, one_sided = _counted(path)
+    rows = []
+
+    def add(corridor, sections, planned_m, drawn_m, checked):
+        difference = drawn_m - planned_m
+        rows.append({
+            "corridor": corridor,
+            "sections": sections,
+            "planned_m": planned_m,
+            "drawn_m": drawn_m,
+            "difference_m": difference,
+            "mismatch": checked and bool(abs(difference) > tolerance * planned_m),
+        })
+
+    for corridor, sections in planned.groupby(level=0, sort=False):
+        placed = corridor in drawn.index
+        add(
+            corridor,
+            ", ".join(f"{section} {length:,.0f} m" for (_, section), length in sections.items()),
+            float(sections.sum()),
+            float(drawn[corridor]) if placed else float("nan"),
+            placed and one_sided,
+        )
+    sides = planned[planned.index.get_level_values(0).isin(SIDES)]
+    if not one_sided and len(sides):
+        add(" + ".join(SIDES), "", float(sides.sum()), float(drawn.sum()), True)
+    return pd.DataFrame(rows, columns=["corridor", "sections", "planned_m", "drawn_m", "difference_m", "mismatch"])
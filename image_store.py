@@ -0,0 +1,256 @@
+"""Content-addressed image store shared by the Images page and the Daily Report.
+
+Every image is stored once under its SHA-256 digest, whatever its file name or
+however many places use it. Users are tracked as named references (a photo file
+under images/, a report upload slot, ...); an object and its renditions are
+deleted when its last reference is released. Renditions are resized JPEGs made
+on first request and kept next to the object. The manifest records objects,
+references and a path index, so a known file under images/ is never re-hashed
+unless its size or mtime changes.
+
+The app and the ingest CLI both write the store. Every change to the manifest
+holds an exclusive lock on manifest.lock (see file_lock.py), reads the
+manifest again if another process has replaced it since, and saves it before
+the lock is released.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from PIL import Image, ImageOps
+
+from file_lock import file_lock
+
+STORE_DIR = os.path.join("data", "image_store")
+MANIFEST_PATH = os.path.join(STORE_DIR, "manifest.json")
+LOCK_PATH = os.path.join(STORE_DIR, "manifest.lock")
+CHUNK_BYTES = 1024 * 1024
+
+# name -> (width, height, exact). Exact renditions are resized to the size as
+# is, the others are fitted inside it keeping their aspect ratio.
+RENDITIONS = {
+    "thumb": (256, 256, False),
+    "grid": (800, 400, True),      # progress photo cards on the Images page
+    "report": (1200, 1200, False), # Daily Report PDF photographs
+}
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+class NotAnImage(ValueError):
+    pass
+
+
+_lock = threading.RLock()
+# (stat key of the manifest file, its parsed contents)
+_cached = (None, None)
+_rendition_locks = {}
+
+
+def object_path(digest):
+    """Where the original bytes of an object live"""
+    return os.path.join(STORE_DIR, "objects", digest[:2], digest)
+
+
+def rendition_path(digest, name):
+    """Where a rendition lives, whether or not it has been made yet"""
+    return os.path.join(STORE_DIR, "renditions", name, digest[:2], f"{digest}.jpg")
+
+
+def _stat_key():
+    try:
+        stat = os.stat(MANIFEST_PATH)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _load_manifest():
+    # Parsed again only when a save, by this or another process, replaced the file
+    global _cached
+    key = _stat_key()
+    if key is None:
+        return {"objects": {}, "paths": {}}
+    if _cached[0] != key:
+        with open(MANIFEST_PATH) as f:
+            _cached = (key, json.load(f))
+    return _cached[1]
+
+
+def _save_manifest(manifest):
+    global _cached
+    fd, tmp_path = tempfile.mkstemp(dir=STORE_DIR, suffix=".json.part")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+    _cached = (_stat_key(), manifest)
+
+
+@contextlib.contextmanager
+def _transaction(write=True):
+    """The current manifest, under the store's thread and process locks; saved afterwards when ``write``"""
+    global _cached
+    with _lock, file_lock(LOCK_PATH, shared=not write):
+        manifest = _load_manifest()
+        try:
+            yield manifest
+        except BaseException:
+            # The cached copy may be half changed; read it from disk next time
+            _cached = (None, None)
+            raise
+        if write:
+            _save_manifest(manifest)
+
+
+def _add(tmp_path, digest, size, ref):
+    """Move a hashed temp file into the store (unless already there) and reference it.
+
+    Raises NotAnImage, and deletes the temp file, when PIL cannot read it.
+    """
+    try:
+        with Image.open(tmp_path) as img:
+            width, height = img.size
+            image_format = img.format
+    except (OSError, Image.DecompressionBombError):
+        os.remove(tmp_path)
+        raise NotAnImage("not a readable image") from None
+
+    with _transaction() as manifest:
+        entry = manifest["objects"].get(digest)
+        if entry is None:
+            os.makedirs(os.path.dirname(object_path(digest)), exist_ok=True)
+            os.replace(tmp_path, object_path(digest))
+            entry = manifest["objects"][digest] = {
+                "size": size, "width": width, "height": height, "format": image_format, "refs": {},
+            }
+        else:
+            os.remove(tmp_path)
+        entry["refs"][ref] = time.time()
+    return digest
+
+
+def put_stream(fileobj, ref, max_bytes=None):
+    """Store a file-like object read in chunks and return its digest.
+
+    Raises ImageTooLarge as soon as more than ``max_bytes`` have been read.
+    """
+    os.makedirs(STORE_DIR, exist_ok=True)
+    sha256 = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=STORE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := fileobj.read(CHUNK_BYTES):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ImageTooLarge(f"larger than {max_bytes // 2**20} MB")
+                sha256.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return _add(tmp_path, sha256.hexdigest(), size, ref)
+
+
+def put_file(path):
+    """Digest of an image file, storing it on first sight; referenced as ``file:<path>``.
+
+    The object is a hard link to the file where possible: replace photos under
+    images/ with new files rather than editing them in place.
+    """
+    stat = os.stat(path)
+    with _transaction(write=False) as manifest:
+        known = manifest["paths"].get(path)
+        if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size \
+                and known["digest"] in manifest["objects"]:
+            return known["digest"]
+
+    # Hashed in place and hard-linked into the store, so a shipped photo is not kept twice on disk
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_BYTES):
+            sha256.update(chunk)
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp_path = os.path.join(STORE_DIR, f".{uuid.uuid4().hex}.part")
+    try:
+        os.link(path, tmp_path)
+    except OSError:
+        # Another filesystem, or one without hard links
+        shutil.copyfile(path, tmp_path)
+    digest = _add(tmp_path, sha256.hexdigest(), stat.st_size, f"file:{path}")
+    with _transaction() as manifest:
+        previous = manifest["paths"].get(path)
+        manifest["paths"][path] = {"digest": digest, "mtime": stat.st_mtime, "size": stat.st_size}
+    if previous and previous["digest"] != digest:
+        release(previous["digest"], f"file:{path}")
+    return digest
+
+
+def release(digest, ref):
+    """Drop one reference; the object and its renditions go with the last one"""
+    with _transaction() as manifest:
+        entry = manifest["objects"].get(digest)
+        if entry is None:
+            return
+        entry["refs"].pop(ref, None)
+        if not entry["refs"]:
+            del manifest["objects"][digest]
+            for path in [object_path(digest)] + [rendition_path(digest, name) for name in RENDITIONS]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def expire_refs(prefix, max_age_seconds):
+    """Release references starting with ``prefix`` that are older than ``max_age_seconds``"""
+    cutoff = time.time() - max_age_seconds
+    with _transaction(write=False) as manifest:
+        stale = [
+            (digest, ref)
+            for digest, entry in manifest["objects"].items()
+            for ref, added in entry["refs"].items()
+            if ref.startswith(prefix) and added < cutoff
+        ]
+    for digest, ref in stale:
+        release(digest, ref)
+
+
+def rendition(digest, name):
+    """Path of a resized JPEG of the object, made once on first request"""
+    path = rendition_path(digest, name)
+    if os.path.exists(path):
+        return path
+
+    with _lock:
+        lock = _rendition_locks.setdefault((digest, name), threading.Lock())
+    with lock:
+        if not os.path.exists(path):
+            width, height, exact = RENDITIONS[name]
+            with Image.open(object_path(digest)) as img:
+                img = ImageOps.exif_transpose(img).convert("RGB")
+                if exact:
+                    img = img.resize((width, height))
+                else:
+                    img.thumbnail((width, height))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+                with os.fdopen(fd, "wb") as out:
+                    img.save(out, format="JPEG", quality=85, optimize=True)
+            os.replace(tmp_path, path)
+    with _lock:
+        _rendition_locks.pop((digest, name), None)
+    return path
+
+
+def manifest():
+    """Copy of the manifest: objects with their references, and the path index"""
+    with _transaction(write=False) as manifest:
+        return json.loads(json.dumps(manifest))
+
@@ -0,0 +1,258 @@
+import io
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date
+
+import pandas as pd
+
+from data_store import STATION_FILES, load_sheets
+
+DB_PATH = os.environ.get("ISSUE_DB_PATH", "data/issues.db")
+ISSUE_SHEET = "Issue Log"
+
+logger = logging.getLogger(__name__)
+# Databases this process has already checked for their schema and seed
+_ready = set()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    station      TEXT    NOT NULL,
+    issue_id     INTEGER NOT NULL,
+    corridor     TEXT,
+    description  TEXT    NOT NULL,
+    status       TEXT    NOT NULL DEFAULT 'Pending',
+    owner        TEXT,
+    information  TEXT,
+    created_on   TEXT    NOT NULL,
+    resolved_on  TEXT,
+    PRIMARY KEY (station, issue_id)
+);
+CREATE INDEX IF NOT EXISTS idx_issues_status ON issues (status, station);
+CREATE INDEX IF NOT EXISTS idx_issues_created ON issues (created_on);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+"""
+
+INSERT_ISSUE = (
+    "INSERT OR IGNORE INTO issues (station, issue_id, corridor, description, status, "
+    "owner, information, created_on, resolved_on) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Statuses the station logs write, casefolded -> the two the database keeps
+STATUSES = {
+    "pending": "Pending",
+    "open": "Pending",
+    "in progress": "Pending",
+    "solved": "Solved",
+    "completed": "Solved",
+    "closed": "Solved",
+    "resolved": "Solved",
+}
+
+# Issue Log sheet column -> database column
+COLUMNS = {
+    "Station": "station",
+    "Issue ID": "issue_id",
+    "Corridor": "corridor",
+    "Description": "description",
+    "Status": "status",
+    "Owner": "owner",
+    "Information": "information",
+    "Created on": "created_on",
+    "Resolved on": "resolved_on",
+}
+
+
+def connect(db_path=DB_PATH):
+    """Open a connection in WAL mode so readers never wait on a writer"""
+    conn = sqlite3.connect(db_path, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+def _write(conn, sql, params=(), many=False):
+    # One short IMMEDIATE transaction per write; bumping the revision lets readers
+    # tell whether their cached copy of the table is still current.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.executemany(sql, params) if many else conn.execute(sql, params)
+        rows = cursor.fetchall()
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return rows, cursor.rowcount
+
+
+def _value(value):
+    return None if pd.isna(value) else value
+
+
+def _status(value):
+    text = str(_value(value) or "").strip()
+    return STATUSES.get(text.casefold(), text) if text else "Pending"
+
+
+def _iso(value):
+    return None if pd.isna(value) else pd.Timestamp(value).date().isoformat()
+
+
+def revision(db_path=DB_PATH):
+    """Monotonic counter bumped by every write, used as a cache key"""
+    ensure_database(db_path)
+    with closing(connect(db_path)) as conn:
+        return conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+
+def ensure_database(db_path=DB_PATH):
+    """Create the schema and seed it from the station workbooks, once per database.
+
+    Both happen in one IMMEDIATE transaction, so a session arriving meanwhile
+    waits for the seeded tables instead of finding an empty file, and a
+    failure rolls everything back to be tried again on the next call.
+    """
+    if db_path in _ready and os.path.exists(db_path):
+        return
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    with closing(connect(db_path)) as conn:
+        # Parse the workbooks before taking the write lock, and only while unseeded
+        rows = None if _seeded(conn) else _issue_rows(STATION_FILES)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            if not _seeded(conn):
+                conn.executemany(INSERT_ISSUE, rows if rows is not None else _issue_rows(STATION_FILES))
+                conn.execute("INSERT INTO meta (key, value) VALUES ('seeded', 1)")
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            elif _normalise_statuses(conn):
+                # Seeded before statuses were normalised
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    _ready.add(db_path)
+
+
+def _seeded(conn):
+    try:
+        return conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone() is not None
+    except sqlite3.OperationalError:  # no meta table yet
+        return False
+
+
+def _normalise_statuses(conn):
+    """Rewrite stored statuses in their canonical spelling; returns whether any changed"""
+    changed = False
+    for (status,) in conn.execute("SELECT DISTINCT status FROM issues").fetchall():
+        if _status(status) != status:
+            conn.execute("UPDATE issues SET status = ? WHERE status = ?", (_status(status), status))
+            changed = True
+    return changed
+
+
+def _issue_row(station, record):
+    issue_id = pd.to_numeric(record.get("Issue ID"), errors="coerce")
+    if pd.isna(issue_id) or issue_id != int(issue_id):
+        raise ValueError(f"Issue ID {record.get('Issue ID')!r} is not a whole number")
+    description = _value(record.get("Description"))
+    if description is None or not str(description).strip():
+        raise ValueError("no Description")
+    return (
+        station,
+        int(issue_id),
+        _value(record.get("Corridor")),
+        str(description),
+        _status(record.get("Status")),
+        _value(record.get("Owner")),
+        _value(record.get("Information")),
+        _iso(record.get("Created on")) or date.today().isoformat(),
+        _iso(record.get("Resolved on")),
+    )
+
+
+def _issue_rows(station_files):
+    """Database rows of every workbook's Issue Log; invalid rows are logged and left out"""
+    rows = []
+    for station, path in station_files.items():
+        if not os.path.exists(path):
+            continue
+        sheets = load_sheets(path)
+        if ISSUE_SHEET not in sheets:
+            continue
+        # Sheet row numbers, counting the header as row 1
+        for number, record in enumerate(sheets[ISSUE_SHEET].to_dict("records"), start=2):
+            try:
+                rows.append(_issue_row(station, record))
+            except (TypeError, ValueError) as e:
+                logger.warning("%s %s row %d skipped: %s", path, ISSUE_SHEET, number, e)
+    return rows
+
+
+def import_from_excel(station_files=STATION_FILES, db_path=DB_PATH):
+    """Copy Issue Log rows from the workbooks; rows already in the database are kept as they are"""
+    ensure_database(db_path)
+    rows = _issue_rows(station_files)
+    with closing(connect(db_path)) as conn:
+        _, inserted = _write(conn, INSERT_ISSUE, rows, many=True)
+    return inserted
+
+
+def read_issues(db_path=DB_PATH):
+    """All issues as a DataFrame with the workbook's column names"""
+    ensure_database(db_path)
+    with closing(connect(db_path)) as conn:
+        df = pd.read_sql_query("SELECT * FROM issues ORDER BY created_on, station, issue_id", conn)
+    df = df.rename(columns={db: sheet for sheet, db in COLUMNS.items()})
+    return df.assign(**{
+        "Created on": pd.to_datetime(df["Created on"]),
+        "Resolved on": pd.to_datetime(df["Resolved on"]),
+    })
+
+
+def add_issue(station, description, corridor=None, owner=None, created_on=None, db_path=DB_PATH):
+    """Insert a new Pending issue and return its per-station Issue ID"""
+    ensure_database(db_path)
+    created_on = (created_on or date.today()).isoformat()
+    with closing(connect(db_path)) as conn:
+        rows, _ = _write(
+            conn,
+            "INSERT INTO issues (station, issue_id, corridor, description, owner, created_on) "
+            "SELECT ?, COALESCE(MAX(issue_id), 0) + 1, ?, ?, ?, ? FROM issues WHERE station = ? "
+            "RETURNING issue_id",
+            (station, corridor, description, owner, created_on, station),
+        )
+        return rows[0][0]
+
+
+def resolve_issue(station, issue_id, resolved_on=None, db_path=DB_PATH):
+    """Mark one issue Solved; returns False if it does not exist"""
+    ensure_database(db_path)
+    resolved_on = (resolved_on or date.today()).isoformat()
+    with closing(connect(db_path)) as conn:
+        _, updated = _write(
+            conn,
+            "UPDATE issues SET status = 'Solved', resolved_on = ? WHERE station = ? AND issue_id = ?",
+            (resolved_on, station, int(issue_id)),
+        )
+        return updated > 0
+
+
+def export_to_excel(db_path=DB_PATH):
+    """Workbook bytes with one Issue Log sheet per station, in the workbook layout"""
+    issues = read_issues(db_path)
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for station, sheet in issues.groupby("Station", sort=True):
+            sheet.drop(columns="Station").to_excel(writer, sheet_name=station[:31], index=False)
+    return buffer.getvalue()
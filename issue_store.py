@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import issue_db
+
+OPEN_STATUS = "Pending"
+# Statuses, casefolded, that leave an issue open; the station logs write them in any case
+OPEN_STATUSES = frozenset({"pending", "open", "in progress"})
+OPTIONAL_COLUMNS = ["Owner", "Information"]
+# Low-cardinality columns stored as categoricals so filtering compares integer codes
+INDEXED_COLUMNS = ["Station", "Status", "Corridor", "Owner"]
+
+ROW_COLORS = {
+    "open": "background-color: #FFDDC1",
+    "closed": "background-color: #D5E8D4",
+}
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_issue_table(revision, db_path):
+    issues = issue_db.read_issues(db_path)
+    # Optional columns only show up once some issue actually uses them
+    issues = issues.drop(columns=[col for col in OPTIONAL_COLUMNS if issues[col].isna().all()])
+    issues = issues.assign(**{
+        col: issues[col].astype("category") for col in INDEXED_COLUMNS if col in issues.columns
+    })
+
+    # Keep the table sorted by creation date so date ranges resolve by binary search
+    return issues.sort_values("Created on", kind="stable", ignore_index=True)
+
+
+def load_issues(db_path=issue_db.DB_PATH):
+    """Issues of every station in one indexed table, rebuilt only after a write to the issue database"""
+    return _build_issue_table(issue_db.revision(db_path), db_path)
+
+
+def filter_issues(issues, stations=None, statuses=None, owners=None,
+                  created_between=None, resolved_between=None):
+    """Select issues by station, status, owner and created/resolved date ranges.
+
+    Empty or None criteria are ignored. Date ranges are ``(start, end)`` pairs,
+    inclusive, where either end may be None.
+    """
+    mask = np.ones(len(issues), dtype=bool)
+
+    for column, values in [("Station", stations), ("Status", statuses), ("Owner", owners)]:
+        if values and column in issues.columns:
+            mask &= issues[column].isin(values).to_numpy()
+
+    if created_between:
+        start, end = created_between
+        created = issues["Created on"].to_numpy()
+        lo = 0 if start is None else np.searchsorted(created, np.datetime64(pd.Timestamp(start)), side="left")
+        hi = len(issues) if end is None else np.searchsorted(created, np.datetime64(pd.Timestamp(end)), side="right")
+        in_range = np.zeros(len(issues), dtype=bool)
+        in_range[lo:hi] = True
+        mask &= in_range
+
+    if resolved_between and "Resolved on" in issues.columns:
+        start, end = resolved_between
+        resolved = issues["Resolved on"]
+        if start is not None:
+            mask &= (resolved >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (resolved <= pd.Timestamp(end)).to_numpy()
+
+    return issues[mask]
+
+
+def is_open(statuses):
+    """Boolean array: which of the statuses leave their issue open, in any letter case"""
+    return statuses.astype("string").str.casefold().isin(OPEN_STATUSES).to_numpy()
+
+
+def issue_metrics(issues, today=None):
+    """Per-station issue counts, time-to-resolve and open-age, computed in a single groupby"""
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+
+    open_issues = is_open(issues["Status"])
+    created = issues["Created on"]
+    resolved = issues["Resolved on"] if "Resolved on" in issues.columns else pd.Series(pd.NaT, index=issues.index)
+
+    per_issue = pd.DataFrame({
+        "Station": issues["Station"],
+        "Open": open_issues,
+        "Days to Resolve": (resolved - created).dt.days.where(~open_issues),
+        "Open Age": (today - created).dt.days.where(open_issues),
+    })
+    metrics = per_issue.groupby("Station", observed=True).agg(**{
+        "Issues": ("Open", "size"),
+        "Open": ("Open", "sum"),
+        "Mean Days to Resolve": ("Days to Resolve", "mean"),
+        "Max Days to Resolve": ("Days to Resolve", "max"),
+        "Mean Open Age (days)": ("Open Age", "mean"),
+        "Oldest Open (days)": ("Open Age", "max"),
+    })
+    return metrics.reset_index()
+
+
+def style_issues(df):
+    """Colour open and closed rows with one vectorized style frame instead of a per-row callback"""
+    colors = np.where(is_open(df["Status"]), ROW_COLORS["open"], ROW_COLORS["closed"])
+    styles = pd.DataFrame(
+        np.repeat(colors[:, None], df.shape[1], axis=1),
+        index=df.index,
+        columns=df.columns,
+    )
+    return df.style.apply(lambda _: styles, axis=None)
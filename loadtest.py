@@ -0,0 +1,305 @@
+"""Drive concurrent headless sessions through the app and find its breaking point.
+
+Starts ``streamlit run Utility.py`` on a free local port (or attaches to a
+running server with ``--url``/``--pid``), then for each concurrency level runs
+N simulated viewers over the Streamlit websocket protocol. Each viewer switches
+station, picks a corridor and section, opens the Plotting and Images pages and
+submits a Daily Report. A change to a widget inside an st.fragment reruns only
+that fragment, as it does in a browser. Per-step latency percentiles, errors and server RSS are
+reported per level; the breaking point is the first level whose p95 exceeds
+``--slo`` seconds or whose error rate exceeds ``--max-error-rate``.
+
+    python loadtest.py --levels 1,5,10,20 --iterations 3 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.Selectbox_pb2 import Selectbox
+from websockets.asyncio.client import connect
+
+# Newer Streamlit releases send the selected option itself, older ones its index
+SELECTBOX_SENDS_STRING = "raw_value" in Selectbox.DESCRIPTOR.fields_by_name
+WIDGET_TYPES = {"selectbox", "text_input", "button", "text_area", "number_input", "slider"}
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class Session:
+    """One simulated browser tab speaking the Streamlit websocket protocol"""
+
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.pages = {}        # page name -> page_script_hash
+        self.page_hash = ""
+        self.widgets = {}      # label -> widget proto of the current page
+        self.fragments = {}    # label -> id of the fragment drawing the widget, "" outside fragments
+        self.fragment_id = ""  # fragment the next rerun is scoped to, set by a widget change
+        self.states = {}       # widget id -> WidgetState kwargs carried between reruns
+
+    async def __aenter__(self):
+        ws_url = "ws" + self.url.rstrip("/").removeprefix("http") + "/_stcore/stream"
+        self.ws = await connect(ws_url, max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, triggers=()):
+        """Send the current widget states and wait for the run to finish; returns error count"""
+        message = BackMsg()
+        client_state = message.rerun_script
+        client_state.page_script_hash = self.page_hash
+        client_state.fragment_id = fragment_id = self.fragment_id
+        self.fragment_id = ""
+        for widget_id, value in self.states.items():
+            state = client_state.widget_states.widgets.add(id=widget_id)
+            setattr(state, *value)
+        for widget_id in triggers:
+            client_state.widget_states.widgets.add(id=widget_id, trigger_value=True)
+        await self.ws.send(message.SerializeToString())
+
+        # A fragment run redraws only its own widgets
+        self.widgets = {label: widget for label, widget in self.widgets.items()
+                        if fragment_id and self.fragments[label] != fragment_id}
+        errors = 0
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind in ("new_session", "navigation"):
+                pages = forward.new_session.app_pages if kind == "new_session" else forward.navigation.app_pages
+                self.pages.update({page.page_name: page.page_script_hash for page in pages})
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    errors += 1
+                elif element_type in WIDGET_TYPES:
+                    widget = getattr(element, element_type)
+                    self.widgets[widget.label] = widget
+                    self.fragments[widget.label] = forward.delta.fragment_id
+            elif kind == "script_finished":
+                # 0 = finished successfully; 1 = error, 2 = rerun requested, 3 = fragment finished
+                if forward.script_finished == 2:
+                    # st.rerun() interrupted the run; the step lasts until the run it started ends
+                    self.widgets = {}
+                    continue
+                return errors + (forward.script_finished == 1)
+            elif kind == "page_not_found":
+                return errors + 1
+
+    def select(self, label, option=None):
+        widget = self.widgets[label]
+        self.fragment_id = self.fragments[label]
+        options = list(widget.options)
+        option = random.choice(options) if option is None else option
+        if SELECTBOX_SENDS_STRING:
+            self.states[widget.id] = ("string_value", option)
+        else:
+            self.states[widget.id] = ("int_value", options.index(option))
+
+    def type_text(self, label, text):
+        self.states[self.widgets[label].id] = ("string_value", text)
+        self.fragment_id = self.fragments[label]
+
+    def switch_page(self, name_fragment):
+        self.page_hash = next(h for name, h in self.pages.items() if name_fragment in name)
+        self.states = {}
+        self.fragment_id = ""
+
+
+async def viewer_flow(url, iterations, record):
+    async with Session(url) as session:
+        async def step(name, triggers=()):
+            start = time.perf_counter()
+            errors = await session.rerun(triggers)
+            record(name, time.perf_counter() - start, errors)
+
+        for _ in range(iterations):
+            session.page_hash = ""
+            session.states = {}
+            session.fragment_id = ""
+            await step("landing")
+            session.select("Choose a Station")
+            await step("station_switch")
+            session.select("Choose a corridor")
+            await step("corridor_select")
+            session.select("Choose a section")
+            await step("section_select")
+
+            session.switch_page("Plotting")
+            await step("plotting_page")
+            session.switch_page("Images")
+            await step("images_page")
+
+            session.switch_page("Daily")
+            await step("daily_report_page")
+            session.type_text("Contractor Name*", "Load Test Contractor")
+            session.type_text("Inspector Name*", "Load Test Inspector")
+            submit = session.widgets["🚀 Generate Progress Report"]
+            await step("daily_report_submit", triggers=[submit.id])
+
+
+async def run_level(url, sessions, iterations, server_pid):
+    latencies = {}
+    errors = {"count": 0, "requests": 0, "failed_sessions": 0}
+    rss_samples = []
+
+    def record(step, seconds, step_errors):
+        latencies.setdefault(step, []).append(seconds)
+        errors["requests"] += 1
+        errors["count"] += step_errors
+
+    async def sample_rss():
+        while True:
+            rss = _rss_bytes(server_pid) if server_pid else None
+            if rss is not None:
+                rss_samples.append((time.time(), rss))
+            await asyncio.sleep(0.5)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(viewer_flow(url, iterations, record) for _ in range(sessions)), return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+
+    failures = [repr(result) for result in results if isinstance(result, Exception)]
+    errors["failed_sessions"] = len(failures)
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "sessions": sessions,
+        "elapsed_seconds": elapsed,
+        "requests": errors["requests"],
+        "errors": errors["count"],
+        "failed_sessions": errors["failed_sessions"],
+        "failures": sorted(set(failures)),
+        "error_rate": (errors["count"] + errors["failed_sessions"]) / max(errors["requests"], 1),
+        "p95_seconds": _percentile(sorted(all_latencies), 95),
+        "steps": {
+            step: {
+                "count": len(values),
+                "p50": _percentile(sorted(values), 50),
+                "p95": _percentile(sorted(values), 95),
+                "p99": _percentile(sorted(values), 99),
+            }
+            for step, values in latencies.items()
+        },
+        "peak_rss_bytes": max((rss for _, rss in rss_samples), default=None),
+        "rss_samples": rss_samples,
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port):
+    command = [
+        sys.executable, "-m", "streamlit", "run", "Utility.py",
+        "--server.headless", "true", "--server.port", str(port),
+        "--browser.gatherUsageStats", "false",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/_stcore/health", timeout=1):
+                return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Streamlit server did not become healthy within 60 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,2,5,10,20", help="comma-separated concurrent session counts")
+    parser.add_argument("--iterations", type=int, default=2, help="flows each session runs per level")
+    parser.add_argument("--slo", type=float, default=5.0, help="p95 latency budget in seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--url", help="attach to a running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="server process id for RSS sampling with --url")
+    parser.add_argument("--output", help="write the full results as JSON")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url, server_pid = args.url, args.pid
+    else:
+        process, url = start_server(_free_port())
+        server_pid = process.pid
+
+    results = []
+    breaking_point = None
+    try:
+        for sessions in [int(level) for level in args.levels.split(",")]:
+            result = asyncio.run(run_level(url, sessions, args.iterations, server_pid))
+            results.append(result)
+
+            rss = result["peak_rss_bytes"]
+            rss_text = f"peak RSS {rss / 2**20:.0f} MiB" if rss else "peak RSS n/a"
+            print(f"\n== {sessions} sessions: {result['requests']} reruns in {result['elapsed_seconds']:.1f}s, "
+                  f"error rate {result['error_rate']:.1%}, {rss_text}")
+            for failure in result["failures"]:
+                print(f"session failed: {failure}")
+            print(f"{'step':<22}{'n':>5}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}")
+            for step, stats in result["steps"].items():
+                print(f"{step:<22}{stats['count']:>5}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+
+            if result["p95_seconds"] is None or result["p95_seconds"] > args.slo \
+                    or result["error_rate"] > args.max_error_rate:
+                breaking_point = sessions
+                break
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    if breaking_point:
+        print(f"\nBreaking point: {breaking_point} concurrent sessions "
+              f"(p95 budget {args.slo}s, error budget {args.max_error_rate:.0%})")
+    else:
+        print("\nNo breaking point within the tested levels")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"breaking_point": breaking_point, "levels": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -1,11 +1,21 @@
+import os
+from datetime import date
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-from plot_sCurve import plotSCurve
+from plot_sCurve import plotSCurve, plotSCurveComparison
 from plot_Agency import plotAgencyBar, plotCivilWork
+from plot_Rollup import plotProgressRollup
+import bundle
+import export
+import session_memory
+from data_store import STATION_FILES, load_sheets, station_aggregate, station_fingerprint
+from profiling import stage, record_payload
 
 st.set_page_config(page_title="Plotting", page_icon="📈", layout="wide")
+session_memory.track("Plotting")
 
 # Inject custom CSS to widen the main container and reduce padding
 st.markdown(
@@ -34,52 +44,45 @@ st.sidebar.title("Select Station")
 selected_station = st.sidebar.selectbox("Choose a Station", list(station_files.keys()))
 st.sidebar.divider()
 
+@st.cache_data(show_spinner=False, max_entries=1)
+def export_workbook(fingerprint):
+    # One build per version of the station workbooks, shared by every session
+    return export.workbook_bytes()
+
+# Built on request rather than on every first render; a new workbook version asks again
+fingerprint = station_fingerprint()
+if st.session_state.get("export_prepared") != fingerprint:
+    if st.sidebar.button("📦 Prepare Excel export", use_container_width=True):
+        with st.sidebar, st.spinner("Building workbook..."):
+            export_workbook(fingerprint)
+        st.session_state.export_prepared = fingerprint
+        st.rerun()
+else:
+    st.sidebar.download_button(
+        label="📥 Export all stations to Excel",
+        data=export_workbook(fingerprint),
+        file_name=f"Station_Summaries_{date.today().strftime('%Y%m%d')}.xlsx",
+        mime=export.XLSX_MIME,
+        use_container_width=True,
+    )
+st.sidebar.divider()
+
 if "selected_station" not in st.session_state or st.session_state.selected_station != selected_station:
     st.session_state.selected_station = selected_station  # Store selection
     file_path = station_files[selected_station]  # Get corresponding file
     
-    # Load all sheets from Excel file into a dictionary
-    st.session_state.sheets = pd.read_excel(file_path, sheet_name=None)
+    # Load all sheets from Excel file into a shared, read-only dictionary
+    st.session_state.sheets = load_sheets(file_path)
 
-def plot():
-    selected_station = st.session_state.get("selected_station", "No Station Selected")
-    st.title(f"📌 Station: {selected_station.upper()}")
-    
-    sheets = st.session_state.sheets
-    df = sheets["Corridor Work"]
-    
-    # Grouping Data by Corridor (East vs. West)
-    target_columns = ["Planned", "Actual"]
-    east_work = df.loc[df["Corridor"] == "East", target_columns].sum()
-    west_work = df.loc[df["Corridor"] == "West", target_columns].sum()
-    total_work = df[target_columns].sum()
-    
-    # Create Summary DataFrame for Bar Chart 1
-    summary_df = pd.DataFrame({
-        "Category": ["East Side", "West Side", "Total Work"],
-        "Planned": [east_work["Planned"], west_work["Planned"], total_work["Planned"]],
-        "Actual": [east_work["Actual"], west_work["Actual"], total_work["Actual"]]
-    })
-    
-    # Calculate Percentage for Actual Work
-    summary_df["Actual %"] = (summary_df["Actual"] / summary_df["Planned"]) * 100  # Compute progress %
-    
-    # Convert to string with % symbol for display
-    summary_df["Actual % Text"] = summary_df["Actual %"].apply(lambda x: f"{x:.1f}%")
-    
-    # Grouping Data by Identifier (Main Road vs. Secondary Road)
-    road_summary = df.groupby(["Identifier", "Corridor"])[["Planned", "Actual"]].sum().reset_index()
-    # Calculate Percentage for Actual Work
-    road_summary["Actual %"] = (road_summary["Actual"] / road_summary["Planned"]) * 100  # Compute progress %
+@st.cache_resource(show_spinner=False, max_entries=16)
+def corridor_figure(file_path, mtime):
+    """Planned vs. Actual bars of a workbook version, shared by every session; never modify it"""
+    # Planned vs. Actual by Corridor (East vs. West)
+    summary_df = station_aggregate(file_path, "corridors")
     
     # Convert to string with % symbol for display
-    road_summary["Actual % Text"] = road_summary["Actual %"].apply(lambda x: f"{x:.1f}%")
-    
-    # Streamlit App Layout
-    #st.title("📊 Work Progress Visualization")
+    summary_df = summary_df.assign(**{"Actual % Text": summary_df["Actual %"].map(lambda x: f"{x:.1f}%")})
     
-    # First Bar Chart: East Side vs. West Side vs. Total Work
-    st.write("### 🏗️ Work Progress by Corridor (East vs. West)")
     fig1 = px.bar(summary_df, x="Category", y=["Planned", "Actual"], 
                   barmode="group", title="Planned vs. Actual Work Progress by Corridor",
                   labels={"value": "Work Volume", "Category": "Corridor"})
@@ -111,11 +114,35 @@ def plot():
         ]
     )
     
+    return fig1
+
+def plot(file_path):
+    selected_station = st.session_state.get("selected_station", "No Station Selected")
+    st.title(f"📌 Station: {selected_station.upper()}")
+    
+    # First Bar Chart: East Side vs. West Side vs. Total Work
+    st.write("### 🏗️ Work Progress by Corridor (East vs. West)")
+    fig1 = corridor_figure(file_path, os.path.getmtime(file_path))
     st.plotly_chart(fig1)
+    record_payload("plot", fig1)
     
+@st.fragment
+def scurve_panel(progress, file_path):
+    """S-curve of the selected station or of several; its widgets rerun only this fragment"""
+    # Overlay the S-curves of several stations instead of the selected one
+    compare_stations = st.toggle("Compare stations")
+    if compare_stations:
+        available = [station for station, _, _ in station_fingerprint(STATION_FILES)]
+        compared = st.multiselect("Stations to compare", available, default=available)
+        plotSCurveComparison({station: load_sheets(STATION_FILES[station])["Progress"] for station in compared})
+    else:
+        plotSCurve(progress, bundle.figure(file_path, "s-curve"))
+
 sheets = st.session_state.sheets
       
-plot()
-plotSCurve(sheets["Progress"])
-plotAgencyBar(sheets["Corridor Work"])
-plotCivilWork(sheets["Corridor Work"])
\ No newline at end of file
+with stage("page.Plotting"):
+    plot(station_files[selected_station])
+    scurve_panel(sheets["Progress"], station_files[selected_station])
+    plotProgressRollup(st.session_state.selected_station)
+    plotAgencyBar(station_files[selected_station])
+    plotCivilWork(station_files[selected_station])
\ No newline at end of file
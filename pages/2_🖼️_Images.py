@@ -1,11 +1,18 @@
 import streamlit as st
 import pandas as pd
-from PIL import Image
 import os
 import base64
-import io
+import folium
+from streamlit_folium import st_folium
+
+import image_store
+import photo_index
+import session_memory
+import tiles
+from profiling import profiled, stage, record_payload
 
 st.set_page_config(page_title="Images", page_icon="🖼️", layout="wide")
+session_memory.track("Images")
 
 # CSS with proper image containment
 st.markdown(
@@ -40,12 +47,68 @@ st.markdown(
     """, unsafe_allow_html=True
 )
 
+@profiled()
 def img_to_bytes(img_path):
-    img = Image.open(img_path)
-    img = img.resize((800, 400))  # Optional: Set consistent dimensions
-    img_bytes = io.BytesIO()
-    img.save(img_bytes, format="PNG")
-    return base64.b64encode(img_bytes.getvalue()).decode()
+    # The 800x400 rendition is made once per distinct photo and reused from the store
+    with open(image_store.rendition(image_store.put_file(img_path), "grid"), "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+def plan_viewer(img_path):
+    """Zoomable plan drawing; the browser fetches only the tiles in view"""
+    digest = image_store.put_file(img_path)
+    with st.spinner("Preparing plan tiles..."):
+        meta = tiles.pyramid(digest)
+
+    # CRS.Simple: one map unit is 2**max_zoom drawing pixels, with the top-left corner at (0, 0)
+    scale = 2 ** meta["max_zoom"]
+    bounds = [[-meta["height"] / scale, 0], [0, meta["width"] / scale]]
+    plan_map = folium.Map(crs="Simple", tiles=None, min_zoom=0, max_zoom=meta["max_zoom"] + 1,
+                          max_bounds=True, attribution_control=False)
+    folium.TileLayer(
+        tiles=tiles.tile_url(digest), attr="Plan", tile_size=meta["tile_size"], bounds=bounds, no_wrap=True,
+        min_zoom=0, max_zoom=meta["max_zoom"] + 1, max_native_zoom=meta["max_zoom"],
+    ).add_to(plan_map)
+    plan_map.fit_bounds(bounds)
+    st_folium(plan_map, key=f"plan_{digest}", height=600, use_container_width=True, returned_objects=[])
+
+def photo_grid(image_folder, image_files, update_dates):
+    """Photos to show with their date labels, after the sort, date and duplicate controls"""
+    index = photo_index.load_index()
+    paths = [os.path.join(image_folder, f) for f in image_files]
+    photos = pd.DataFrame({
+        "image": list(image_files),
+        "path": paths,
+        "taken": index["taken"].reindex(paths).to_numpy(),
+        "sheet_date": update_dates.to_numpy(),
+    })
+    # EXIF capture time where the photo has one, the hand-typed sheet date otherwise
+    photos["date"] = photos["taken"].fillna(photos["sheet_date"])
+    # No EXIF time and a blank sheet date leave NaT, which has no strftime
+    photos["label"] = [
+        "Date unknown" if pd.isna(d) else f"Taken: {d:%d-%b-%Y}" if not pd.isna(t) else f"Last Updated: {d:%d-%b-%Y}"
+        for t, d in zip(photos["taken"], photos["date"])
+    ]
+
+    col1, col2, col3 = st.columns([2, 3, 2])
+    order = col1.selectbox("Sort photos", ["Sheet order", "Newest first", "Oldest first"])
+    if order != "Sheet order":
+        photos = photos.sort_values("date", ascending=order == "Oldest first", kind="stable")
+
+    dates = photos["date"].dropna()
+    if not dates.empty and dates.min() != dates.max():
+        first, last = dates.min().date(), dates.max().date()
+        picked = col2.date_input("Dated between", (first, last), min_value=first, max_value=last)
+        if len(picked) == 2:
+            photos = photos[photos["date"].isna() | photos["date"].dt.date.between(*picked)]
+
+    indexed = photos[photos["path"].isin(index.index)]
+    pairs = photo_index.near_duplicates(index.loc[indexed["path"], "dhash"])
+    if col3.toggle("Hide near-duplicates", disabled=not pairs, help="Show one photo of each group that looks alike"):
+        # Keep the first photo of each pair in the current order
+        photos = photos.drop(index=indexed.index[sorted({j for _, j, _ in pairs})])
+    if len(indexed) < len(photos):
+        st.caption("Some photos are not indexed yet; run `python photo_index.py` to date and compare them.")
+    return photos
 
 def image(): 
     selected_station = st.session_state.get("selected_station", "No Station Selected")
@@ -56,8 +119,6 @@ def image():
 
     image_folder = "images"
     image_files = df["image"]
-    df["update_date"] = pd.to_datetime(df["update_date"]).dt.strftime("%d-%b-%Y")
-    image_dates = df["update_date"]
     
     # Full-width plan view
     with st.container():
@@ -66,12 +127,13 @@ def image():
             {selected_station} Plan View
         </p>
         """
-        st.image(os.path.join(image_folder, image_files[0]), use_container_width=True)
+        plan_viewer(os.path.join(image_folder, image_files[0]))
         st.markdown(caption_html, unsafe_allow_html=True)
 
-    # Progress photos grid
-    remaining_images = image_files[1:]
-    remaining_dates = image_dates[1:]
+    # Progress photos grid, ordered and filtered from the photo index alone
+    photos = photo_grid(image_folder, image_files[1:], pd.to_datetime(df["update_date"])[1:])
+    remaining_images = photos["image"].tolist()
+    remaining_dates = photos["label"].tolist()
     
     for i in range(0, len(remaining_images), 2):
         cols = st.columns(2)
@@ -86,18 +148,19 @@ def image():
                 try:
                     # Convert image to base64
                     b64_image = img_to_bytes(img_path)
+                    record_payload("img_to_bytes", b64_image)
                     
                     # Create HTML block with container and image
                     html = f"""
                     <div>
                         <div class="image-container">
-                            <img src="data:image/png;base64,{b64_image}">
+                            <img src="data:image/jpeg;base64,{b64_image}">
                             <p style="text-align: center; margin: 10px 0 0 0; font-weight: bold; font-size: 24px;">
                                 Section: {base_name.upper()}
                             </p>                           
                         </div>
                         <p style="text-align: right; margin: 5px 0 0 0; font-size: 12px; color: #666; font-style: italic;">
-                            Last Updated: {image_date}
+                            {image_date}
                         </p>
                     </div>
                     """
@@ -107,4 +170,5 @@ def image():
                     st.error(f"Error loading {img_file}: {str(e)}")
     
 if __name__ == "__main__":
-    image()
\ No newline at end of file
+    with stage("page.Images"):
+        image()
\ No newline at end of file
@@ -1,7 +1,15 @@
 import streamlit as st
-import pandas as pd
+from datetime import date
+
+import issue_db
+import session_memory
+from auth import check_passcode
+from profiling import stage
+from data_store import STATION_FILES
+from issue_store import is_open, load_issues, filter_issues, issue_metrics, style_issues
 
 st.set_page_config(page_title="Issue Logs", page_icon="⁉️", layout="wide")
+session_memory.track("Issue_Logs")
 
 # Inject custom CSS to widen the main container and reduce padding
 st.markdown(
@@ -25,8 +33,6 @@ if 'sheets' not in st.session_state or 'main_page' not in st.session_state:
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 
-CORRECT_PASSCODE = st.secrets["passwords"]["my_pass"]
-
 # Authentication gate
 if not st.session_state.authenticated:
     st.title("Authentication Required 🔒")
@@ -42,9 +48,12 @@ if not st.session_state.authenticated:
         submit = st.button("Submit")
 
         if submit:
-            if passcode == CORRECT_PASSCODE:
+            ok, retry_after = check_passcode(passcode)
+            if ok:
                 st.session_state.authenticated = True
                 st.rerun()
+            elif retry_after:
+                st.error(f"⏳ Too many attempts. Please try again in {retry_after:.0f} seconds.")
             else:
                 st.error("⚠️ Incorrect passcode. Please try again.")
     
@@ -54,20 +63,112 @@ def issues():
     selected_station = st.session_state.get("selected_station", "No Station Selected")
     st.header(f"⌚ {selected_station.upper()} Station Issue Logs")
     
-    sheets = st.session_state.sheets
+    all_issues = load_issues()
+    
+    # Sidebar filters
+    st.sidebar.title("Filter Issues")
+    station_options = list(all_issues["Station"].cat.categories)
+    stations = st.sidebar.multiselect(
+        "Stations", station_options,
+        default=[selected_station] if selected_station in station_options else station_options,
+    )
+    statuses = st.sidebar.multiselect("Status", list(all_issues["Status"].cat.categories))
+    owners = []
+    if "Owner" in all_issues.columns:
+        owners = st.sidebar.multiselect("Owner", list(all_issues["Owner"].cat.categories))
+    
+    created = all_issues["Created on"].dropna()
+    created_between = None
+    if not created.empty:
+        created_range = st.sidebar.date_input(
+            "Created between", (created.min().date(), created.max().date())
+        )
+        if len(created_range) == 2:
+            created_between = created_range
+    
+    df = filter_issues(all_issues, stations=stations, statuses=statuses, owners=owners,
+                       created_between=created_between)
+    
+    # SLA metrics across the selected stations
+    st.write("### 📊 Resolution Metrics")
+    st.dataframe(issue_metrics(df), hide_index=True)
+    
+    st.write(f"### 📋 Issues ({len(df)})")
+    # Format the date columns on a display projection of the shared table
+    date_columns = [col for col in ["Created on", "Resolved on"] if col in df.columns]
+    df = df.assign(**{col: df[col].dt.strftime("%d-%b-%Y") for col in date_columns})
     
-    df = sheets["Issue Log"]
+    st.dataframe(style_issues(df), hide_index=True)
+    
+    manage_issues(all_issues, selected_station)
 
-    def highlight_rows(row):
-        return ['background-color: #FFDDC1'] * len(row) if row.Status == "Pending" else ['background-color: #D5E8D4'] * len(row)
+@st.cache_data(show_spinner=False, max_entries=1)
+def export_workbook(revision):
+    return issue_db.export_to_excel()
 
-    # Format the date columns
-    if "Created on" in df.columns:
-        df["Created on"] = pd.to_datetime(df["Created on"]).dt.strftime("%d-%b-%Y")
-    if 'Resolved on' in df.columns:
-        df["Resolved on"] = pd.to_datetime(df["Resolved on"]).dt.strftime("%d-%b-%Y")
+def manage_issues(all_issues, default_station):
+    st.write("### ✏️ Update Issue Log")
+    
+    if "issue_message" in st.session_state:
+        st.success(st.session_state.pop("issue_message"))
+    
+    stations = list(STATION_FILES)
+    add_col, resolve_col = st.columns(2)
+    
+    # Each submit is a single-row write to the issue database
+    with add_col:
+        with st.form("add_issue_form", clear_on_submit=True):
+            st.markdown("**➕ Add Issue**")
+            station = st.selectbox(
+                "Station", stations,
+                index=stations.index(default_station) if default_station in stations else 0,
+            )
+            corridor = st.selectbox("Corridor", ["East", "West", "Cross"])
+            description = st.text_area("Description")
+            owner = st.text_input("Owner", placeholder="Optional")
+            
+            if st.form_submit_button("Add Issue"):
+                if not description.strip():
+                    st.error("⚠️ Please enter a description.")
+                else:
+                    issue_id = issue_db.add_issue(station, description.strip(), corridor=corridor,
+                                                  owner=owner.strip() or None)
+                    st.session_state.issue_message = f"✅ Issue #{issue_id} added for {station}."
+                    st.rerun()
+    
+    with resolve_col:
+        open_issues = all_issues[is_open(all_issues["Status"])]
+        choices = {
+            f"{row['Station']} #{row['Issue ID']}: {row['Description']}": (row["Station"], row["Issue ID"])
+            for row in open_issues.to_dict("records")
+        }
+        with st.form("resolve_issue_form"):
+            st.markdown("**✅ Resolve Issue**")
+            choice = st.selectbox("Open issue", list(choices))
+            resolved_on = st.date_input("Resolved on", value=date.today())
+            
+            if st.form_submit_button("Mark as Solved") and choice:
+                station, issue_id = choices[choice]
+                issue_db.resolve_issue(station, issue_id, resolved_on=resolved_on)
+                st.session_state.issue_message = f"✅ Issue #{issue_id} at {station} marked as solved."
+                st.rerun()
     
-    st.dataframe(df.style.apply(highlight_rows, axis=1), hide_index=True)
+    # Excel compatibility
+    export_col, import_col = st.columns(2)
+    with export_col:
+        st.download_button(
+            label="📥 Export Issue Log to Excel",
+            data=export_workbook(issue_db.revision()),
+            file_name=f"Issue_Log_{date.today().strftime('%Y%m%d')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            use_container_width=True,
+        )
+    with import_col:
+        if st.button("🔄 Import New Issues from Station Workbooks", use_container_width=True):
+            inserted = issue_db.import_from_excel()
+            st.session_state.issue_message = f"✅ Imported {inserted} new issue(s) from the workbooks."
+            st.rerun()
     
 if __name__ == "__main__":
-    issues()
\ No newline at end of file
+    with stage("page.Issue_Logs"):
+        issues()
\ No newline at end of file
@@ -10,8 +10,13 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 import tempfile
+import uuid
 import os
 
+import session_memory
+from upload_store import (UploadNotAnImage, UploadTooLarge, prepared_image, prepared_path, preparation_error,
+                          release_upload, retry_preparation, store_upload)
+
 # Page configuration
 st.set_page_config(
     page_title="Site Visit Progress Report",
@@ -19,6 +24,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+session_memory.track("Daily_Report")
 
 # Custom CSS for modern UI
 st.markdown("""
@@ -262,11 +268,10 @@ def create_pdf_report(report_data, images):
         # Process images and create compact 2x2 grid
         processed_images = []
         
-        for i, img_data in enumerate(images):
-            if img_data is not None:
+        for i, img_path in enumerate(images):
+            if img_path is not None:
                 try:
-                    img_data.seek(0)
-                    img = Image(img_data, width=1.4*inch, height=1.1*inch)
+                    img = Image(img_path, width=1.4*inch, height=1.1*inch)
                     processed_images.append(img)
                 except Exception as e:
                     processed_images.append(Paragraph(f"Img {i+1}: Error", small_style))
@@ -324,6 +329,62 @@ def create_pdf_report(report_data, images):
     buffer.seek(0)
     return buffer
 
+PHOTO_SLOTS = 4
+
+def _photo_ref(slot):
+    # Names this session's hold on the photo in a slot within the image store
+    owner = st.session_state.setdefault("photo_owner", uuid.uuid4().hex)
+    return f"{owner}:{slot}"
+
+def store_photo(slot, key):
+    uploaded = st.session_state.get(key)
+    if uploaded is None:
+        return
+    try:
+        st.session_state.report_photos[slot] = (store_upload(uploaded, _photo_ref(slot)), uploaded.name)
+    except (UploadTooLarge, UploadNotAnImage) as e:
+        st.session_state.photo_error = f"⚠️ {e}"
+    # The image store has its own copy now; without this the upload manager holds the bytes until the session ends
+    session_memory.discard_upload(uploaded)
+    # A fresh uploader key resets the widget for the next photo
+    st.session_state.uploader_versions[slot] += 1
+
+def remove_photo(slot):
+    digest, _ = st.session_state.report_photos[slot]
+    release_upload(digest, _photo_ref(slot))
+    st.session_state.report_photos[slot] = None
+
+def photo_uploads():
+    """Photo slots kept outside the form so each upload is stored and downscaled as soon as it lands"""
+    st.markdown('<div class="section-header">📷 Site Photographs</div>', unsafe_allow_html=True)
+    st.markdown("Upload up to 4 images for your report")
+    
+    photos = st.session_state.setdefault("report_photos", [None] * PHOTO_SLOTS)
+    versions = st.session_state.setdefault("uploader_versions", [0] * PHOTO_SLOTS)
+    if "photo_error" in st.session_state:
+        st.error(st.session_state.pop("photo_error"))
+    
+    for slot, col in enumerate(st.columns(PHOTO_SLOTS)):
+        with col:
+            if photos[slot] is None:
+                key = f"img{slot + 1}_{versions[slot]}"
+                st.file_uploader(f"Image {slot + 1}", type=['png', 'jpg', 'jpeg'], key=key,
+                                 on_change=store_photo, args=(slot, key))
+                continue
+            
+            digest, name = photos[slot]
+            error = preparation_error(digest)
+            if os.path.exists(prepared_path(digest)):
+                st.image(prepared_path(digest), caption=name, use_container_width=True)
+            elif error is not None:
+                st.error(f"⚠️ Could not prepare {name}: {error}")
+                st.button("Retry", key=f"retry_img{slot + 1}", on_click=retry_preparation, args=(digest,))
+            else:
+                st.caption(f"⏳ Preparing {name}...")
+            st.button("Remove", key=f"remove_img{slot + 1}", on_click=remove_photo, args=(slot,))
+    
+    return photos
+
 def main():
     # Header
     st.markdown("""
@@ -344,6 +405,8 @@ def main():
         st.markdown("• Comprehensive progress tracking")
         st.markdown("• Official formatting")
     
+    photos = photo_uploads()
+    
     # Main form
     with st.form("progress_report_form"):
         col1, col2 = st.columns(2)
@@ -415,26 +478,6 @@ def main():
             next_day_plan = st.text_area("Next Day Activities Plan", 
                 placeholder="Outline planned activities for the next day...", height=150)
         
-        # Image uploads
-        st.markdown('<div class="section-header">📷 Site Photographs</div>', unsafe_allow_html=True)
-        st.markdown("Upload up to 4 images for your report")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        images = []
-        
-        with col1:
-            img1 = st.file_uploader("Image 1", type=['png', 'jpg', 'jpeg'], key="img1")
-            images.append(img1)
-        with col2:
-            img2 = st.file_uploader("Image 2", type=['png', 'jpg', 'jpeg'], key="img2")
-            images.append(img2)
-        with col3:
-            img3 = st.file_uploader("Image 3", type=['png', 'jpg', 'jpeg'], key="img3")
-            images.append(img3)
-        with col4:
-            img4 = st.file_uploader("Image 4", type=['png', 'jpg', 'jpeg'], key="img4")
-            images.append(img4)
-        
         # Submit button
         st.markdown("<br>", unsafe_allow_html=True)
         submitted = st.form_submit_button("🚀 Generate Progress Report", use_container_width=True)
@@ -472,6 +515,9 @@ def main():
             }
             
             try:
+                # Photos were downscaled in the background when uploaded
+                images = [prepared_image(photo[0]) if photo else None for photo in photos]
+                
                 # Generate PDF
                 pdf_buffer = create_pdf_report(report_data, images)
                 
@@ -0,0 +1,85 @@
+import time
+
+import streamlit as st
+
+import session_memory
+from profiling import stage, record_payload
+from snapshots import KEY_COLUMNS, diff, list_snapshots, load_snapshot
+
+st.set_page_config(page_title="Changes", page_icon="🔀", layout="wide")
+session_memory.track("Changes")
+
+# Inject custom CSS to widen the main container and reduce padding
+st.markdown(
+    """
+    <style>
+    .main .block-container {
+        max-width: 90%;
+        padding-left: 2rem;
+        padding-right: 2rem;
+    }
+    </style>
+    """,
+    unsafe_allow_html=True,
+)
+
+def snapshot_label(entry):
+    return f"{entry['created'].replace('T', ' ')} ({entry['version']})"
+
+def changes():
+    st.title("🔀 Changes Between Snapshots")
+
+    entries = list_snapshots()
+    if len(entries) < 2:
+        st.info("Snapshots are taken by `python data_processing.py`; at least two are needed to compare.")
+        return
+
+    # Newest first, comparing the latest snapshot with the one before it by default
+    entries = entries[::-1]
+    col1, col2 = st.columns(2)
+    with col1:
+        before = st.selectbox("From", entries, index=1, format_func=snapshot_label)
+    with col2:
+        after = st.selectbox("To", entries, index=0, format_func=snapshot_label)
+
+    carried = sorted(station for station, source in after["sources"].items() if "carried_from" in source)
+    if carried:
+        st.warning(
+            f"{', '.join(carried)} failed validation when the \"To\" snapshot was taken; "
+            "their rows are carried over from an earlier snapshot."
+        )
+
+    start = time.perf_counter()
+    delta = diff(load_snapshot(before["version"]), load_snapshot(after["version"]))
+    elapsed = time.perf_counter() - start
+
+    stations = sorted(delta["station"].unique())
+    selected = st.sidebar.multiselect("Stations", stations, default=stations)
+    delta = delta[delta["station"].isin(selected)]
+
+    counts = delta["change"].value_counts()
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Changed rows", int(counts.get("changed", 0)))
+    metric_cols[1].metric("Added rows", int(counts.get("added", 0)))
+    metric_cols[2].metric("Removed rows", int(counts.get("removed", 0)))
+    metric_cols[3].metric("Actual Δ", f"{delta['actual_delta'].sum():+,.0f}")
+    st.caption(f"Diffed in {elapsed * 1000:.0f} ms")
+
+    if delta.empty:
+        st.success("No Planned/Actual changes between these snapshots")
+        return
+
+    by_station = delta.groupby("station")[["planned_delta", "actual_delta"]].sum().reset_index()
+    st.write("### Net change by station")
+    st.dataframe(by_station, hide_index=True, use_container_width=True)
+
+    st.write("### Changed rows")
+    table = delta.drop(columns="occurrence").rename(columns=lambda c: c.replace("_", " ").title())
+    st.dataframe(table, hide_index=True, use_container_width=True,
+                 column_order=[c.title() for c in KEY_COLUMNS if c != "occurrence"] + ["Change",
+                               "Planned Old", "Planned New", "Planned Delta",
+                               "Actual Old", "Actual New", "Actual Delta"])
+    record_payload("page.Changes", table)
+
+with stage("page.Changes"):
+    changes()
@@ -0,0 +1,103 @@
+import time
+
+import streamlit as st
+
+import session_memory
+import sql_explorer
+from auth import check_passcode
+from profiling import stage, record_payload
+
+st.set_page_config(page_title="SQL Explorer", page_icon="🧮", layout="wide")
+session_memory.track("SQL_Explorer")
+
+# Inject custom CSS to widen the main container and reduce padding
+st.markdown(
+    """
+    <style>
+    .main .block-container {
+        max-width: 90%;
+        padding-left: 2rem;
+        padding-right: 2rem;
+    }
+    </style>
+    """,
+    unsafe_allow_html=True,
+)
+
+EXAMPLES = {
+    "TITAS completion per size": """SELECT station, size, sum(planned) AS planned, sum(actual) AS actual,
+       round(100 * sum(actual) / sum(planned), 1) AS completion_pct
+FROM corridor_work
+WHERE task_group = 'Utility Laying' AND work_breakdown = 'TITAS'
+GROUP BY station, size
+ORDER BY station, size""",
+    "Open issues older than 30 days": """SELECT station, issue_id, corridor, description, created_on,
+       date_diff('day', created_on, current_date) AS days_open
+FROM issues
+WHERE lower(status) = 'pending' AND created_on < current_date - INTERVAL 30 DAY
+ORDER BY created_on""",
+    "Latest actual progress per station": """SELECT station, max(date) AS last_report, arg_max(actual, date) AS actual_pct
+FROM progress
+WHERE actual IS NOT NULL
+GROUP BY station
+ORDER BY actual_pct DESC""",
+}
+
+# Check authentication status; the explorer reads the issue log too
+if 'authenticated' not in st.session_state:
+    st.session_state.authenticated = False
+
+# Authentication gate
+if not st.session_state.authenticated:
+    st.title("Authentication Required 🔒")
+    passcode = st.text_input("Enter passcode:", type="password")
+    if st.button("Submit"):
+        ok, retry_after = check_passcode(passcode)
+        if ok:
+            st.session_state.authenticated = True
+            st.rerun()
+        elif retry_after:
+            st.error(f"⏳ Too many attempts. Please try again in {retry_after:.0f} seconds.")
+        else:
+            st.error("⚠️ Incorrect passcode. Please try again.")
+    st.stop()  # Stop execution if not authenticated
+
+def explorer():
+    st.title("🧮 SQL Explorer")
+    st.caption(
+        f"Read-only DuckDB SQL over every station. Queries stop after {sql_explorer.QUERY_TIMEOUT:g} s "
+        f"and return at most {sql_explorer.MAX_ROWS:,} rows."
+    )
+
+    st.sidebar.title("Tables")
+    for table, columns in sql_explorer.schema().items():
+        with st.sidebar.expander(table):
+            st.markdown("\n".join(f"- `{column}` {data_type.lower()}" for column, data_type in columns))
+
+    example = st.selectbox("Start from an example", list(EXAMPLES))
+    with st.form("sql_form"):
+        sql = st.text_area("SQL", value=EXAMPLES[example], height=200)
+        if st.form_submit_button("▶️ Run"):
+            st.session_state.sql_query = sql
+
+    sql = st.session_state.get("sql_query")
+    if not sql:
+        return
+
+    start = time.perf_counter()
+    try:
+        result, truncated, seconds = sql_explorer.cached_query(sql)
+    except sql_explorer.QueryError as e:
+        st.error(str(e))
+        return
+    elapsed = time.perf_counter() - start
+
+    if truncated:
+        st.warning(f"Only the first {len(result):,} rows are shown.")
+    st.dataframe(result, hide_index=True, use_container_width=True)
+    st.caption(f"{len(result):,} rows · query {seconds * 1000:.1f} ms · served in {elapsed * 1000:.1f} ms")
+    record_payload("page.SQL_Explorer", result)
+    st.download_button("📥 Download CSV", data=result.to_csv(index=False), file_name="query.csv", mime="text/csv")
+
+with stage("page.SQL_Explorer"):
+    explorer()
@@ -0,0 +1,187 @@
+"""Metadata of every photo: EXIF capture time, GPS position, size and a perceptual hash.
+
+    python photo_index.py            # index images/ now (the ingest CLI also does this)
+
+One Parquet file, data/photo_index.parquet, with a row per file under images/
+and per Daily Report upload in the image store. A file is read again only
+when its mtime or size changes, and new files are read in a process pool.
+Pages sort, filter and compare photos from the index without opening them.
+
+The perceptual hash is a 64-bit difference hash (dHash) of the photo shrunk
+to 9x8 grey pixels; near-duplicates differ in only a few bits. The app (for
+Daily Report uploads) and the ingest CLI both update the index; an update
+holds an exclusive lock on data/photo_index.lock from reading the index to
+replacing it, so neither loses the other's rows.
+"""
+import argparse
+import functools
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+import image_store
+from file_lock import file_lock
+
+IMAGE_FOLDER = "images"
+INDEX_PATH = os.path.join("data", "photo_index.parquet")
+LOCK_PATH = os.path.join("data", "photo_index.lock")
+COLUMNS = ["path", "mtime", "size", "width", "height", "taken", "lat", "lon", "dhash"]
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp")
+UPLOAD_REF_PREFIX = "report-upload:"  # upload_store.UPLOAD_REF_PREFIX, without importing Streamlit
+# Bits two hashes may differ by and still count as the same photo
+NEAR_DUPLICATE_BITS = 6
+
+_EXIF_IFD, _GPS_IFD = 0x8769, 0x8825
+_DATETIME_ORIGINAL, _DATETIME = 36867, 306
+
+_lock = threading.Lock()
+
+
+def dhash(img):
+    """64-bit difference hash: is each pixel of a 9x8 grey thumbnail brighter than its right neighbour"""
+    pixels = np.asarray(img.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def _degrees(value, ref):
+    degrees, minutes, seconds = (float(v) for v in value)
+    sign = -1 if ref in ("S", "W") else 1
+    return sign * (degrees + minutes / 60 + seconds / 3600)
+
+
+def read_metadata(path):
+    """One index row for an image file; runs in the indexing worker processes"""
+    stat = os.stat(path)
+    row = {"path": path, "mtime": stat.st_mtime, "size": stat.st_size, "taken": None, "lat": None, "lon": None}
+    with Image.open(path) as img:
+        exif = img.getexif()
+        taken = exif.get_ifd(_EXIF_IFD).get(_DATETIME_ORIGINAL) or exif.get(_DATETIME)
+        if taken:
+            try:
+                row["taken"] = datetime.strptime(str(taken).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+            except ValueError:
+                pass
+        gps = exif.get_ifd(_GPS_IFD)
+        if 2 in gps and 4 in gps:
+            try:
+                row["lat"], row["lon"] = _degrees(gps[2], gps.get(1)), _degrees(gps[4], gps.get(3))
+            except (TypeError, ValueError, ZeroDivisionError):
+                pass
+        row["width"], row["height"] = img.size
+        # The hash needs only 9x8 pixels; let the JPEG decoder skip most of the work
+        img.draft("L", (64, 64))
+        row["dhash"] = dhash(img)
+    return row
+
+
+def photo_paths():
+    """Every photo under images/ and every upload held by the image store"""
+    paths = [
+        os.path.join(root, name)
+        for root, _, names in os.walk(IMAGE_FOLDER)
+        for name in sorted(names)
+        if name.lower().endswith(IMAGE_SUFFIXES)
+    ]
+    uploads = sorted(
+        digest for digest, entry in image_store.manifest()["objects"].items()
+        if any(ref.startswith(UPLOAD_REF_PREFIX) for ref in entry["refs"])
+    )
+    return paths + [image_store.object_path(digest) for digest in uploads]
+
+
+def _read_index():
+    try:
+        return pd.read_parquet(INDEX_PATH)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=COLUMNS)
+
+
+def _frame(rows):
+    index = pd.DataFrame(rows, columns=COLUMNS)
+    return index.astype({"mtime": float, "size": "int64", "width": "int64", "height": "int64",
+                         "taken": "datetime64[us]", "lat": float, "lon": float, "dhash": "uint64"})
+
+
+def update_index(paths=None, workers=None, prune=True):
+    """Index new and changed photos; returns the number of files read.
+
+    ``paths`` defaults to photo_paths(). With ``prune`` the rows of files that
+    are no longer on disk are dropped. More than a handful of files are read in
+    a process pool of ``workers`` processes.
+    """
+    paths = photo_paths() if paths is None else list(paths)
+    with _lock, file_lock(LOCK_PATH):
+        index = _read_index()
+        known = {row.path: (row.mtime, row.size) for row in index.itertuples()}
+        stale = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if known.get(path) != (stat.st_mtime, stat.st_size):
+                stale.append(path)
+
+        keep = index[~index["path"].isin(stale)]
+        if prune:
+            keep = keep[[os.path.exists(path) for path in keep["path"]]]
+        if not stale and len(keep) == len(index):
+            return 0
+
+        if len(stale) > 4 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rows = list(pool.map(_read_or_none, stale, chunksize=8))
+        else:
+            rows = [_read_or_none(path) for path in stale]
+        rows = [row for row in rows if row is not None]
+
+        index = pd.concat([_frame(keep.to_dict("records")), _frame(rows)], ignore_index=True)
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(INDEX_PATH), suffix=".parquet.part")
+        os.close(fd)
+        index.sort_values("path").to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, INDEX_PATH)
+        return len(rows)
+
+
+def _read_or_none(path):
+    # Unreadable or non-image files are left out of the index rather than failing the batch
+    try:
+        return read_metadata(path)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _load(mtime):
+    return _read_index().set_index("path")
+
+
+def load_index():
+    """The index by path; cached until the index file changes"""
+    try:
+        return _load(os.path.getmtime(INDEX_PATH))
+    except FileNotFoundError:
+        return _frame([]).set_index("path")
+
+
+def near_duplicates(hashes, max_bits=NEAR_DUPLICATE_BITS):
+    """Pairs (i, j, differing bits) with i < j among a sequence of dHashes"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    distance = np.bitwise_count(hashes[:, None] ^ hashes[None, :])
+    i, j = np.nonzero(np.triu(distance <= max_bits, k=1))
+    return list(zip(i.tolist(), j.tolist(), distance[i, j].tolist()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args()
+    print(f"{update_index(workers=args.workers)} photos indexed, {len(load_index())} in {INDEX_PATH}")
@@ -1,134 +1,109 @@
+import os
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-def plotAgencyBar(df):
+from data_store import station_aggregate
+from downsample import fit_figure
+from profiling import profiled, record_payload
+
+AGENCY_COLORS = {
+    "DWASA": "skyblue",
+    "DNCC Drainage": "seagreen",
+    "TITAS": "magenta",
+    "BTCL": "crimson",
+    "Pvt. Communication Cable": "coral"  # Add other agencies as needed.
+}
+
+CIVIL_WORK_COLORS = {
+    "Road Reinstatement": "skyblue",
+    "Excavation": "coral",
+    "Pavement Cutting": "#FF9C6E",
+    "Excavation Combined": "#E84118",
+}
+
+
+def _agency_chart(data, corridor):
+    fig = px.bar(
+        data,
+        x="Label",
+        y="Completion (%)",
+        text="Completion (%)",
+        title=f"{corridor} Corridor: Completion Percentage by Task Group",
+        labels={"Label": "Task Breakdown", "Completion (%)": "Completion (%)"},
+        color="Work Breakdown",
+        color_discrete_map=AGENCY_COLORS
+    )
+    # Format text to one decimal place and position above bars. # Ensure text is not clipped
+    fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside', cliponaxis=False)
+    fig.update_layout(
+        plot_bgcolor="white",  # White background
+        legend=dict(font=dict(size=14)),
+        
+    )
+    return fit_figure(fig)
+
+
+def _civil_work_chart(data, corridor):
+    fig = px.bar(
+        data,
+        x="Work Breakdown",
+        y="Completion (%)",
+        text="Completion (%)",
+        title=f"{corridor} Corridor: Completion Percentage by Task Group",
+        labels={"Work Breakdown": "Task Breakdown", "Completion (%)": "Completion (%)"},
+        color="Task Group",
+        color_discrete_map=CIVIL_WORK_COLORS,
+        barmode="group"
+    )
+    # Format text to one decimal place and position above bars.
+    fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside', cliponaxis=False)
+    fig.update_layout(
+        plot_bgcolor="white",  # White background
+        legend=dict(font=dict(size=14)),
+        bargap=0,  # Reduce space between bars (default is 0.2)
+        xaxis=dict(tickangle=-45),
+    )
+    return fit_figure(fig)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def cachedAgencyFigures(file_path, mtime):
+    """(East, West) agency charts of a workbook version, shared by every session; never modify them"""
+    # --- Completion per Corridor, Agency and Size, with custom labels ---
+    grouped = station_aggregate(file_path, "agencies")
+    return tuple(_agency_chart(grouped[grouped["Corridor"] == corridor], corridor) for corridor in ["East", "West"])
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def cachedCivilWorkFigures(file_path, mtime):
+    """(East, West) civil work charts of a workbook version, shared by every session; never modify them"""
+    # --- Detailed and Combined completion per Corridor and Task Group ---
+    combined = station_aggregate(file_path, "civil-work")
+    return tuple(
+        _civil_work_chart(combined[combined["Corridor"] == corridor], corridor) for corridor in ["East", "West"]
+    )
+
+
+@profiled()
+def plotAgencyBar(file_path):
     st.write("### 📈 Agency-wise Bar Chart")
     
-    # --- Filter Data: Only include Utility Laying rows ---
-    df_utility = df[df["Task Group"].str.lower() == "utility laying"]
-    
-    grouped = df_utility.groupby(["Corridor", "Work Breakdown", "Size"], as_index=False).agg({
-                "Planned": "sum",
-                "Actual": "sum"
-            })
-    
-    # Calculate the completion percentage for each group.
-    grouped["Completion (%)"] = (grouped["Actual"] / grouped["Planned"]) * 100
-    
-    # --- Create Custom Labels ---
-    # For each Corridor and Work Breakdown, if there are multiple rows (i.e. multiple Sizes), append the Size.
-    grouped["Label"] = None  # initialize label column
-    
-    for (corr, wb), sub in grouped.groupby(["Corridor", "Work Breakdown"]):
-        if sub.shape[0] > 1:
-            # Multiple entries for the same agency in the corridor: append Size.
-            labels = sub["Work Breakdown"] + " (" + sub["Size"] + ")"
-        else:
-            # Only one entry: use just the agency name.
-            labels = sub["Work Breakdown"]
-        grouped.loc[sub.index, "Label"] = labels
-    
-    # --- Plotting: Separate Bar Charts for East and West ---
-    east_data = grouped[grouped["Corridor"] == "East"]
-    west_data = grouped[grouped["Corridor"] == "West"]
-    
-    color_map = {
-        "DWASA": "skyblue",
-        "DNCC Drainage": "seagreen",
-        "TITAS": "magenta",
-        "BTCL": "crimson",
-        "Pvt. Communication Cable": "coral"  # Add other agencies as needed.
-    }
-    
-    def plot_chart(data, corridor):
-        fig = px.bar(
-            data,
-            x="Label",
-            y="Completion (%)",
-            text="Completion (%)",
-            title=f"{corridor} Corridor: Completion Percentage by Task Group",
-            labels={"Label": "Task Breakdown", "Completion (%)": "Completion (%)"},
-            color="Work Breakdown",
-            color_discrete_map=color_map
-        )
-        # Format text to one decimal place and position above bars. # Ensure text is not clipped
-        fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside', cliponaxis=False)
-        fig.update_layout(
-            plot_bgcolor="white",  # White background
-            legend=dict(font=dict(size=14)),
-            
-        )
-        return fig
-    
-    fig_east = plot_chart(east_data, "East")
-    fig_west = plot_chart(west_data, "West")
+    fig_east, fig_west = cachedAgencyFigures(file_path, os.path.getmtime(file_path))
     
     st.plotly_chart(fig_east)
     st.plotly_chart(fig_west)
+    record_payload("plotAgencyBar", fig_east)
+    record_payload("plotAgencyBar", fig_west)
 
-def plotCivilWork(df):
+@profiled()
+def plotCivilWork(file_path):
     st.write("### 🛣️ Civil Work Bar Chart")
     
-    df_filtered = df[df["Task Group"].isin(["Excavation", "Road Reinstatement"])].copy()
-    
-    # --- Group by Corridor, Task Group, and Work Breakdown ---
-    df_grouped = (
-        df_filtered.groupby(["Corridor", "Task Group", "Work Breakdown"], as_index=False, sort=False)
-        .agg({"Planned": "sum", "Actual": "sum"})
-    )
-    
-    # --- Compute Completion Percentage ---
-    df_grouped["Completion (%)"] = (df_grouped["Actual"] / df_grouped["Planned"]) * 100
-
-    # --- Create Combined Rows ---
-    # For each (Corridor, Task Group) combination, compute the overall (combined) Planned and Actual.
-    combined = (
-        df_grouped.groupby(["Corridor", "Task Group"], as_index=False)
-        .agg({"Planned": "sum", "Actual": "sum"})
-    )
-    combined["Work Breakdown"] = "Combined"  # Label these rows as Combined
-    combined["Completion (%)"] = (combined["Actual"] / combined["Planned"]) * 100
-    
-    # --- Combine the Detailed and Overall Data ---
-    df_combined = pd.concat([df_grouped, combined], ignore_index=True)
-    
-    # --- Separate Data for Each Corridor ---
-    east_df = df_combined[df_combined["Corridor"] == "East"]
-    west_df = df_combined[df_combined["Corridor"] == "West"]
-    
-    color_map = {
-        "Road Reinstatement": "skyblue",
-        "Excavation": "coral",
-        "Pavement Cutting": "#FF9C6E",
-        "Excavation Combined": "#E84118",
-    }
-    
-    # --- Plotting Function ---
-    def plot_chart(data, corridor):
-        fig = px.bar(
-            data,
-            x="Work Breakdown",
-            y="Completion (%)",
-            text="Completion (%)",
-            title=f"{corridor} Corridor: Completion Percentage by Task Group",
-            labels={"Work Breakdown": "Task Breakdown", "Completion (%)": "Completion (%)"},
-            color="Task Group",
-            color_discrete_map=color_map,
-            barmode="group"
-        )
-        # Format text to one decimal place and position above bars.
-        fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside', cliponaxis=False)
-        fig.update_layout(
-            plot_bgcolor="white",  # White background
-            legend=dict(font=dict(size=14)),
-            bargap=0,  # Reduce space between bars (default is 0.2)
-            xaxis=dict(tickangle=-45),
-        )
-        return fig
-    
-    fig_east = plot_chart(east_df, "East")
-    fig_west = plot_chart(west_df, "West")
+    fig_east, fig_west = cachedCivilWorkFigures(file_path, os.path.getmtime(file_path))
     
     st.plotly_chart(fig_east)
-    st.plotly_chart(fig_west)
\ No newline at end of file
+    st.plotly_chart(fig_west)
+    record_payload("plotCivilWork", fig_east)
+    record_payload("plotCivilWork", fig_west)
@@ -1,111 +1,152 @@
+import io
+import os
+
 import streamlit as st
 import pandas as pd
-from PIL import Image
-import matplotlib.pyplot as plt
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+
+from profiling import profiled, stage, record_payload
+
+ROUTE_MAP = "images/routeMap.jpg"
+
+@st.cache_resource(show_spinner=False)
+def _route_map(mtime):
+    # Raw JPEG bytes go to the browser as they are, without re-encoding on every run
+    with open(ROUTE_MAP, "rb") as f:
+        return f.read()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _progress_png(df):
+    """The chart rendered once per version of the progress data.
+
+    Uses a standalone Figure rather than pyplot, which is not thread-safe and
+    would keep every figure alive. Saved with st.pyplot's own defaults.
+    """
+    # Create visualization
+    fig = Figure(figsize=(14, 8), dpi=600)
+    ax = fig.subplots()
+    fig.patch.set_facecolor('#faf0e6')
+    ax.set_facecolor('#faf0e6')
+
+    # --- Original plotting code ---
+    contract_packages = df["Contract Package"].unique()
+    colors = colormaps["Set1"](range(len(contract_packages)))
+    extra_legends = []
+    bar_handles = []
+
+    for i, package in enumerate(contract_packages):
+        subset = df[df["Contract Package"] == package]
+        baseline_bars = ax.barh(
+            subset["Station Name"],
+            subset["Baseline Progress"],
+            color="#000",
+            edgecolor="black",
+            label="Baseline" if i == 0 else "",
+            alpha=0.2,
+            height=0.6
+        )
+        extra_legends.append(baseline_bars)
+
+        current_bars = ax.barh(
+            subset["Station Name"], 
+            subset["Work Progress"], 
+            color=colors[i], 
+            label=package,
+            height=0.4
+        )
+        bar_handles.append(current_bars)
+        
+        ax.bar_label(
+            current_bars,
+            labels=subset["Work Status (%)"],
+            fontsize=9,
+            padding=2,
+            label_type="edge"
+        )
+
+    # Trendline
+    y_pos = range(len(df))
+    x_values = df["Work Progress"]
+    trendline = ax.plot(
+        x_values,
+        y_pos,
+        color="#FF4F0F",
+        linestyle='-',
+        marker='o',
+        markersize=6,
+        linewidth=1.5,
+        alpha=0.7,
+        label="Progress Trend"
+    )
+
+    extra_legends.append(trendline[0])
+    clean_legends = [art for art in extra_legends if not art.get_label().startswith("_")]
 
+    # Legends
+    legend1 = ax.legend(
+        handles=bar_handles,
+        title="Contract Package",
+        loc='upper left',
+        bbox_to_anchor=(1.02, 1))
+    ax.legend(
+        handles=clean_legends,
+        loc='upper left',
+        bbox_to_anchor=(1.02, 0.75))
+    ax.add_artist(legend1)
+
+    # Labels and formatting
+    ax.set_xlabel("Work Progress (%)", fontsize=12, fontweight="bold")
+    ax.set_ylabel("Station Name", fontsize=12, fontweight="bold")
+    ax.set_title("Utility Relocation Progress by Station", fontsize=14, pad=20, fontweight="bold")
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+    ax.set_xlim(0, 107)
+    fig.tight_layout()
+    # --- End plotting code ---
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", dpi=200)
+    return buffer.getvalue()
+
+def progressProjection(df):
+    # Build a per-view projection; the input frame is shared and must not be modified
+    work_progress = pd.to_numeric(df["Work Progress"]) * 100
+    baseline_progress = pd.to_numeric(df["Baseline Progress"]) * 100
+    return df.assign(**{
+        "Work Progress": work_progress,
+        "Work Status (%)": work_progress.map("{:.1f}%".format),
+        "Baseline Progress": baseline_progress,
+        "Baseline Progress (%)": baseline_progress.map("{:.1f}%".format),
+    })
+
+def warmProgressBar(df):
+    """Fill the route map and chart caches ahead of the first viewer"""
+    _route_map(os.path.getmtime(ROUTE_MAP))
+    _progress_png(progressProjection(df))
+
+@profiled()
 def plotProgressBar(df):
     st.write("### 📈 Utility Relocation Progress by Station")
     
     
-    df["Work Progress"] = pd.to_numeric(df["Work Progress"]) * 100
-    df["Work Status (%)"] = df["Work Progress"].apply(lambda x: f"{x:.1f}%")
-    df["Baseline Progress"] = pd.to_numeric(df["Baseline Progress"]) * 100
-    df["Baseline Progress (%)"] = df["Baseline Progress"].apply(lambda x: f"{x:.1f}%")
+    df = progressProjection(df)
     
     # Create columns (1:4 ratio)
     col1, col2 = st.columns([4, 11])
     
     with col1:
         
-        # Load your image - Replace with your image path or URL
-        project_image = Image.open("images/routeMap.jpg")
-        
-        # Display image with caption
-        st.image(project_image, caption="Utility Relocation Route Map", use_container_width=True)
+        with stage("plotProgressBar.route_map"):
+            # Display image with caption
+            st.image(_route_map(os.path.getmtime(ROUTE_MAP)), caption="Utility Relocation Route Map",
+                     use_container_width=True)
 
     with col2:
-        # Create visualization
-        fig, ax = plt.subplots(figsize=(14, 8), dpi=600)
-        fig.patch.set_facecolor('#faf0e6')
-        ax.set_facecolor('#faf0e6')
-    
-        # --- Original plotting code ---
-        contract_packages = df["Contract Package"].unique()
-        colors = plt.cm.Set1(range(len(contract_packages)))
-        extra_legends = []
-        bar_handles = []
-    
-        for i, package in enumerate(contract_packages):
-            subset = df[df["Contract Package"] == package]
-            baseline_bars = ax.barh(
-                subset["Station Name"],
-                subset["Baseline Progress"],
-                color="#000",
-                edgecolor="black",
-                label="Baseline" if i == 0 else "",
-                alpha=0.2,
-                height=0.6
-            )
-            extra_legends.append(baseline_bars)
-    
-            current_bars = ax.barh(
-                subset["Station Name"], 
-                subset["Work Progress"], 
-                color=colors[i], 
-                label=package,
-                height=0.4
-            )
-            bar_handles.append(current_bars)
-            
-            ax.bar_label(
-                current_bars,
-                labels=subset["Work Status (%)"],
-                fontsize=9,
-                padding=2,
-                label_type="edge"
-            )
-    
-        # Trendline
-        y_pos = range(len(df))
-        x_values = df["Work Progress"]
-        trendline = ax.plot(
-            x_values,
-            y_pos,
-            color="#FF4F0F",
-            linestyle='-',
-            marker='o',
-            markersize=6,
-            linewidth=1.5,
-            alpha=0.7,
-            label="Progress Trend"
-        )
-    
-        extra_legends.append(trendline[0])
-        clean_legends = [art for art in extra_legends if not art.get_label().startswith("_")]
-    
-        # Legends
-        legend1 = ax.legend(
-            handles=bar_handles,
-            title="Contract Package",
-            loc='upper left',
-            bbox_to_anchor=(1.02, 1))
-        ax.legend(
-            handles=clean_legends,
-            loc='upper left',
-            bbox_to_anchor=(1.02, 0.75))
-        ax.add_artist(legend1)
-    
-        # Labels and formatting
-        ax.set_xlabel("Work Progress (%)", fontsize=12, fontweight="bold")
-        ax.set_ylabel("Station Name", fontsize=12, fontweight="bold")
-        ax.set_title("Utility Relocation Progress by Station", fontsize=14, pad=20, fontweight="bold")
-        ax.grid(axis='x', linestyle='--', alpha=0.7)
-        ax.set_xlim(0, 107)
-        plt.tight_layout()
-        # --- End plotting code ---
-    
         # Display in Streamlit
-        st.pyplot(fig)
+        with stage("plotProgressBar.pyplot"):
+            png = _progress_png(df)
+            st.image(png, use_container_width=True)
+        record_payload("plotProgressBar.pyplot", png)
         
         # Optional: Show data table
         with st.expander("View Raw Data"):
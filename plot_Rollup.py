@@ -0,0 +1,45 @@
+import streamlit as st
+import plotly.express as px
+
+from rollups import ALL, GRAINS, materialize, rollup_slice
+from profiling import profiled, record_payload
+
+# A fragment: switching the period reruns only this chart
+@st.fragment
+@profiled()
+def plotProgressRollup(station):
+    st.write("### 🗓️ Weekly / Monthly Progress")
+    grain = st.radio("Period", list(GRAINS), horizontal=True, key="rollup_grain")
+
+    # Slices of the precomputed cube; nothing is re-aggregated here
+    cube = materialize()
+    scurve = rollup_slice(cube, grain, "s-curve", station)
+    if scurve.empty:
+        st.info(f"No progress history for {station}")
+        return
+
+    # Cumulative % at the end of each period -> % gained within the period
+    cumulative = scurve[["baseline_pct", "actual_pct"]]
+    gained = cumulative.diff().fillna(cumulative).rename(columns={"baseline_pct": "Baseline", "actual_pct": "Actual"})
+    gained = gained.reset_index()
+
+    fig = px.bar(gained, x="period", y=["Baseline", "Actual"], barmode="group",
+                 labels={"value": "Progress Gained (%)", "period": "Period"},
+                 title=f"{grain} Progress Gained vs. Baseline",
+                 color_discrete_map={"Baseline": "black", "Actual": "red"})
+    fig.update_layout(height=450, legend=dict(font=dict(size=14)))
+    st.plotly_chart(fig)
+    record_payload("plotProgressRollup", fig)
+
+    try:
+        task_groups = cube.loc[(grain, "quantities", station, ALL)].reset_index()
+    except KeyError:
+        return
+    task_groups = task_groups[task_groups["task_group"] != ALL]
+    fig = px.line(task_groups, x="period", y="actual_pct", color="task_group", markers=True,
+                  labels={"actual_pct": "Completion (%)", "period": "Reported", "task_group": "Task Group"},
+                  title=f"{grain} Completion by Task Group")
+    fig.update_yaxes(range=[0, 105])
+    fig.update_layout(height=400)
+    st.plotly_chart(fig)
+    record_payload("plotProgressRollup", fig)
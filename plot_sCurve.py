@@ -1,17 +1,19 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 
-def plotSCurve(df):
-    st.write("### 📈 Progress S-Curve")
-    sheets = st.session_state.sheets
-    df = sheets["Progress"]
-    
-    # Stop the actual work progress curve at 8th March
-    cutoff_date = pd.Timestamp("2025-03-08")
-    df.loc[df["Date"] > cutoff_date, "Actual"] = None
+from aggregates import aligned_scurves, scurve_series
+from downsample import fit_figure
+from profiling import profiled, record_payload
+
+def sCurveFigure(df):
+    """S-curve figure of one Progress sheet; the ingest CLI stores it as JSON in the data bundle"""
+    # Stop the actual work progress curve at the cutoff date
+    df = scurve_series(df)
     
-    fig = px.line(df, x="Date", y=["Baseline", "Actual"],
+    # SVG here; fit_figure switches to WebGL and downsamples once the series gets long
+    fig = px.line(df, x="Date", y=["Baseline", "Actual"], render_mode="svg",
                   labels={"value": "Cumulative Work (%)", "Date": "Date"},
                   title="Cumulative Work Progress vs. Baseline",
                   color_discrete_map={"Baseline": "black", "Actual": "red"})    
@@ -24,7 +26,9 @@ def plotSCurve(df):
         elif trace.name == "Actual":
             trace.line.dash = "solid"  # Solid for Actual
             trace.line.width = 4
-    fig.update_xaxes(tickangle=90, dtick=604800000, showgrid=True, gridcolor="lightgray")  # 7 days in milliseconds
+    # Weekly ticks (in milliseconds) up to a year of data, monthly beyond that
+    dtick = 604800000 if df["Date"].max() - df["Date"].min() <= pd.Timedelta(days=365) else "M1"
+    fig.update_xaxes(tickangle=90, dtick=dtick, showgrid=True, gridcolor="lightgray")
     fig.update_yaxes(rangemode="tozero") # Force the y-axis to start at 0
     fig.update_layout(height=700,
                       legend=dict(font=dict(size=16)),
@@ -37,4 +41,56 @@ def plotSCurve(df):
                           )
                       ])
 
-    st.plotly_chart(fig)
\ No newline at end of file
+    return fit_figure(fig)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def cachedSCurveFigure(df):
+    """sCurveFigure shared by every session showing the same Progress sheet; never modify it"""
+    return sCurveFigure(df)
+
+@profiled()
+def plotSCurve(df, fig=None):
+    st.write("### 📈 Progress S-Curve")
+    if fig is None:
+        fig = cachedSCurveFigure(df)
+    st.plotly_chart(fig)
+    record_payload("plotSCurve", fig)
+
+@profiled()
+def plotSCurveComparison(progress_by_station):
+    st.write("### 📈 Progress S-Curve Comparison")
+    aligned = aligned_scurves(progress_by_station)
+    if aligned.empty:
+        st.info("Select at least one station to compare")
+        return
+
+    # One Scattergl pair per station: WebGL keeps years of daily points across many stations responsive
+    dates = aligned.index
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, station in enumerate(aligned["Baseline"].columns):
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Scattergl(x=dates, y=aligned[("Baseline", station)].to_numpy(), mode="lines",
+                                   name=f"{station} Baseline", legendgroup=station,
+                                   line=dict(color=color, width=2, dash="dash")))
+        fig.add_trace(go.Scattergl(x=dates, y=aligned[("Actual", station)].to_numpy(), mode="lines",
+                                   name=f"{station} Actual", legendgroup=station,
+                                   line=dict(color=color, width=4)))
+
+    fig.update_xaxes(title="Date", tickangle=90, showgrid=True, gridcolor="lightgray")
+    fig.update_yaxes(title="Cumulative Work (%)", rangemode="tozero")
+    fig.update_layout(height=700,
+                      title="Cumulative Work Progress vs. Baseline by Station",
+                      legend=dict(font=dict(size=14)),
+                      shapes=[
+                          dict(
+                              type="rect",
+                              xref="paper", yref="paper",
+                              x0=0, y0=0, x1=1, y1=1,
+                              line=dict(color="black", width=2)
+                          )
+                      ])
+
+    fig = fit_figure(fig)
+    st.plotly_chart(fig)
+    record_payload("plotSCurveComparison", fig)
@@ -0,0 +1,134 @@
+import contextlib
+import functools
+import io
+import os
+import threading
+import time
+import tracemalloc
+
+# UTILITY_PROFILE=1 records wall/CPU time and payload sizes, UTILITY_PROFILE=alloc
+# also traces allocations (tracemalloc slows Python code down noticeably).
+# When unset, decorators return the original function and stage() a shared no-op.
+_MODE = os.environ.get("UTILITY_PROFILE", "").strip().lower()
+ENABLED = _MODE in ("1", "true", "on", "alloc")
+TRACE_ALLOCATIONS = _MODE == "alloc"
+
+if TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+METRICS = {
+    "calls": ("counter", "Number of times the stage ran"),
+    "wall_seconds": ("counter", "Wall-clock time spent in the stage"),
+    "wall_seconds_max": ("gauge", "Slowest single run of the stage"),
+    "cpu_seconds": ("counter", "CPU time of the running thread spent in the stage"),
+    "alloc_bytes": ("counter", "Peak bytes allocated above the starting level while the stage ran"),
+    "payload_bytes": ("counter", "Bytes sent to the browser by the stage"),
+}
+
+_lock = threading.Lock()
+_stats = {}
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def _entry(name):
+    return _stats.setdefault(name, dict.fromkeys(METRICS, 0))
+
+
+class _Stage:
+    __slots__ = ("name", "wall", "cpu", "memory")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.memory = 0
+        if TRACE_ALLOCATIONS:
+            tracemalloc.reset_peak()
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        # The traced peak is process-wide: nested stages and concurrent sessions make this approximate
+        allocated = tracemalloc.get_traced_memory()[1] - self.memory if TRACE_ALLOCATIONS else 0
+        with _lock:
+            entry = _entry(self.name)
+            entry["calls"] += 1
+            entry["wall_seconds"] += wall
+            entry["wall_seconds_max"] = max(entry["wall_seconds_max"], wall)
+            entry["cpu_seconds"] += cpu
+            entry["alloc_bytes"] += allocated
+        return False
+
+
+def stage(name):
+    """Context manager timing one hot-path stage; a shared no-op when profiling is off"""
+    return _Stage(name) if ENABLED else _NULL_STAGE
+
+
+def profiled(name=None):
+    """Decorator form of stage(), named after the function unless given a name"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Stage(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _payload_size(payload):
+    if isinstance(payload, (bytes, bytearray)):
+        return len(payload)
+    if isinstance(payload, str):
+        return len(payload.encode())
+    if hasattr(payload, "to_plotly_json"):  # Plotly figure
+        return len(payload.to_json())
+    if hasattr(payload, "savefig"):  # Matplotlib figure, re-rendered as PNG
+        buffer = io.BytesIO()
+        payload.savefig(buffer, format="png")
+        return buffer.tell()
+    if hasattr(payload, "to_json"):  # DataFrame sent as grid rows
+        return len(payload.to_json(orient="records"))
+    return 0
+
+
+def record_payload(name, payload):
+    """Add the serialized size of something sent to the browser to a stage's total"""
+    if not ENABLED:
+        return
+    size = _payload_size(payload)
+    with _lock:
+        _entry(name)["payload_bytes"] += size
+
+
+def snapshot():
+    """Copy of the per-stage totals, keyed by stage name"""
+    with _lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def prometheus_text():
+    """Stage totals in the Prometheus text exposition format"""
+    stats = snapshot()
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        name = f"utility_stage_{metric}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for stage_name, entry in sorted(stats.items()):
+            label = stage_name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{name}{{stage="{label}"}} {entry[metric]:.6g}')
+    return "\n".join(lines) + "\n"
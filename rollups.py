@@ -0,0 +1,158 @@
+"""Weekly and monthly rollups of station progress, stored as Parquet.
+
+The cube has one row per (grain, series, station, corridor, task group, period):
+
+* series "s-curve": the station's Progress sheet, Baseline/Actual cumulative %
+  at the end of each period. Corridor and task group are "All".
+* series "quantities": Planned/Actual totals of the Corridor Work sheet per
+  corridor and task group (with "All" subtotals), filed under the period of the
+  workbook's modification time. Each new version of a workbook replaces that
+  period's snapshot and leaves earlier periods in place, so history accumulates.
+
+One Parquet file per station under data/rollups is rebuilt only when that
+station's workbook changes. Charts read slices of the cube with rollup_slice().
+"""
+import functools
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aggregates import scurve_series
+from data_store import STATION_FILES, load_sheets, station_fingerprint
+
+ROLLUP_DIR = os.path.join("data", "rollups")
+STATE_PATH = os.path.join(ROLLUP_DIR, "state.json")
+GRAINS = {"Weekly": "W", "Monthly": "M"}
+ALL = "All"
+KEY = ["grain", "series", "station", "corridor", "task_group", "period"]
+MEASURES = ["baseline_pct", "actual_pct", "planned", "actual"]
+
+_lock = threading.Lock()
+
+
+def _partition_path(station):
+    return os.path.join(ROLLUP_DIR, station.lower().replace(" ", "_") + ".parquet")
+
+
+def _period_start(dates, freq):
+    return dates.dt.to_period(freq).dt.start_time
+
+
+def _scurve_rollup(progress, freq):
+    series = scurve_series(progress)
+    # Cumulative curves: a period's value is its last reading (skipping the blanked Actual)
+    rolled = series.groupby(_period_start(series["Date"], freq))[["Baseline", "Actual"]].last()
+    return pd.DataFrame({
+        "series": "s-curve",
+        "corridor": ALL,
+        "task_group": ALL,
+        "period": rolled.index,
+        "baseline_pct": rolled["Baseline"].to_numpy(),
+        "actual_pct": rolled["Actual"].to_numpy(),
+    })
+
+
+def _quantity_rollup(work, period):
+    target = ["Planned", "Actual"]
+    totals = pd.concat([
+        work.groupby(["Corridor", "Task Group"])[target].sum(),
+        work.groupby("Corridor")[target].sum().assign(**{"Task Group": ALL}).set_index("Task Group", append=True),
+        work.groupby("Task Group")[target].sum().assign(Corridor=ALL).set_index("Corridor", append=True)
+            .swaplevel(),
+        work[target].sum().to_frame().T.assign(Corridor=ALL, **{"Task Group": ALL})
+            .set_index(["Corridor", "Task Group"]),
+    ])
+    return pd.DataFrame({
+        "series": "quantities",
+        "corridor": totals.index.get_level_values(0).astype(str),
+        "task_group": totals.index.get_level_values(1).astype(str),
+        "period": period,
+        "planned": totals["Planned"].to_numpy(dtype=float),
+        "actual": totals["Actual"].to_numpy(dtype=float),
+        "actual_pct": (totals["Actual"] / totals["Planned"] * 100).to_numpy(dtype=float),
+    })
+
+
+def _station_rows(station, sheets, mtime, previous):
+    """All cube rows of one station, keeping snapshots of earlier periods from ``previous``"""
+    snapshot_time = pd.Series([pd.Timestamp(mtime, unit="s")])
+    parts = []
+    for grain, freq in GRAINS.items():
+        if "Progress" in sheets:
+            parts.append(_scurve_rollup(sheets["Progress"], freq).assign(grain=grain))
+        if "Corridor Work" in sheets:
+            period = _period_start(snapshot_time, freq)[0]
+            parts.append(_quantity_rollup(sheets["Corridor Work"], period).assign(grain=grain))
+            if previous is not None:
+                history = previous[(previous["grain"] == grain) & (previous["series"] == "quantities")]
+                parts.append(history[history["period"] != period])
+    rows = pd.concat(parts, ignore_index=True).assign(station=station)
+    return rows.reindex(columns=KEY + MEASURES)
+
+
+def _write_partition(rows, path):
+    fd, tmp_path = tempfile.mkstemp(dir=ROLLUP_DIR, suffix=".parquet.part")
+    os.close(fd)
+    pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _read_state():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@functools.lru_cache(maxsize=1)
+def _load_cube(partitions):
+    # Keyed on (path, workbook mtime) pairs, so a rebuilt partition is read again
+    frames = [pq.read_table(path).to_pandas() for path, _ in partitions]
+    if not frames:
+        return pd.DataFrame(columns=KEY + MEASURES).set_index(KEY)
+    return pd.concat(frames, ignore_index=True).set_index(KEY).sort_index()
+
+
+def materialize(station_files=STATION_FILES):
+    """Bring the cube up to date with the workbooks on disk and return it.
+
+    Only stations whose workbook changed since the last run are re-aggregated;
+    the cube comes back indexed by the key columns, sorted for slice lookups.
+    """
+    with _lock:
+        os.makedirs(ROLLUP_DIR, exist_ok=True)
+        state = _read_state()
+        changed = False
+        for station, path, mtime in station_fingerprint(station_files):
+            if state.get(station) == [path, mtime] and os.path.exists(_partition_path(station)):
+                continue
+            partition = _partition_path(station)
+            previous = pq.read_table(partition).to_pandas() if os.path.exists(partition) else None
+            _write_partition(_station_rows(station, load_sheets(path), mtime, previous), partition)
+            state[station] = [path, mtime]
+            changed = True
+        if changed:
+            fd, tmp_path = tempfile.mkstemp(dir=ROLLUP_DIR, suffix=".json.part")
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f, indent=1)
+            os.replace(tmp_path, STATE_PATH)
+
+        partitions = tuple(sorted(
+            (_partition_path(station), mtime) for station, (_, mtime) in state.items()
+            if station in station_files
+        ))
+    return _load_cube(partitions)
+
+
+def rollup_slice(cube, grain, series, station, corridor=ALL, task_group=ALL):
+    """Measures per period for one cell of the cube; empty if the cell does not exist"""
+    try:
+        return cube.loc[(grain, series, station, corridor, task_group)]
+    except KeyError:
+        return pd.DataFrame(columns=MEASURES, index=pd.DatetimeIndex([], name="period"))
@@ -0,0 +1,225 @@
+"""Memory held by each viewer's session, with idle sessions swapped out.
+
+Every page calls track() at the top of its script run. It sizes the values in
+the session's state plus the session's files in Streamlit's upload manager, and
+stamps the session as active. A session's own bytes are counted per session.
+The workbook sheets are shared by every session through load_sheets' cache, so
+they are counted once, as shared bytes.
+
+A session that has not run for UTILITY_SESSION_IDLE seconds (default 600), or
+that owns more than UTILITY_SESSION_MAX_MB (default 64), is swapped out:
+- each Workbook in its state becomes a SheetsRef, which looks the sheets up in
+  the shared cache again on first use;
+- owned frames and byte strings above SWAP_MIN_BYTES are dropped, for the page
+  to rebuild;
+- uploads no uploader widget still shows are removed from the upload manager.
+Sessions that have disconnected are forgotten at the next sweep. The
+diagnostics page shows the totals.
+"""
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.uploaded_file_manager import UploadedFile
+
+from data_store import SheetsRef, Workbook, load_sheets
+
+IDLE_SECONDS = float(os.environ.get("UTILITY_SESSION_IDLE", 600))
+MAX_SESSION_BYTES = int(float(os.environ.get("UTILITY_SESSION_MAX_MB", 64)) * 1024 * 1024)
+# Values smaller than this are not worth rebuilding
+SWAP_MIN_BYTES = 64 * 1024
+SWEEP_INTERVAL = 30
+
+
+class _Session:
+    __slots__ = ("state", "page", "last_seen", "state_bytes", "upload_bytes", "swapped")
+
+    def __init__(self, state):
+        self.state = state
+        self.page = None
+        self.last_seen = time.monotonic()
+        self.state_bytes = 0
+        self.upload_bytes = 0
+        self.swapped = False
+
+
+@st.cache_resource(show_spinner=False)
+def _registry():
+    # Shared by all sessions: {session id: _Session}, the lock and the time of the last sweep
+    return {}, threading.Lock(), [0.0]
+
+
+def _size(value, seen):
+    """Bytes a value holds for its session alone"""
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (Workbook, SheetsRef, UploadedFile)):
+        # Sheets are shared through the cache and uploads counted from the upload manager
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return value.nbytes if isinstance(value, memoryview) else len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_size(k, seen) + _size(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(_size(v, seen) for v in value)
+    return sys.getsizeof(value)
+
+
+def _state_items(state):
+    # Keyless widgets are left out; the rest is a copy, safe to size while the session runs
+    return state.filtered_state
+
+
+def _upload_files(session_id):
+    """{file id: bytes} the upload manager keeps for a session"""
+    manager = Runtime.instance().uploaded_file_mgr
+    # Only the in-memory manager, Streamlit's default, keeps files per session
+    storage = getattr(manager, "file_storage", {}).get(session_id, {})
+    return {file_id: len(record.data) for file_id, record in list(storage.items())}
+
+
+def _measure(session_id, entry):
+    entry.state_bytes = sum(_size(value, set()) for value in _state_items(entry.state).values())
+    entry.upload_bytes = sum(_upload_files(session_id).values())
+
+
+def _shown_uploads(items):
+    file_ids = set()
+    for value in items.values():
+        for upload in value if isinstance(value, list) else [value]:
+            if isinstance(upload, UploadedFile):
+                file_ids.add(upload.file_id)
+    return file_ids
+
+
+def swap_out(session_id, entry):
+    """Release what a session holds that can be rebuilt; returns the bytes released"""
+    before = entry.state_bytes + entry.upload_bytes
+    items = _state_items(entry.state)
+    for key, value in items.items():
+        if isinstance(value, Workbook) and value.path is not None:
+            entry.state[key] = SheetsRef(value.path)
+        elif isinstance(value, (pd.DataFrame, pd.Series, bytes, bytearray)) and _size(value, set()) >= SWAP_MIN_BYTES:
+            del entry.state[key]
+
+    shown = _shown_uploads(items)
+    manager = Runtime.instance().uploaded_file_mgr
+    for file_id in _upload_files(session_id):
+        if file_id not in shown:
+            manager.remove_file(session_id, file_id)
+
+    _measure(session_id, entry)
+    entry.swapped = True
+    return before - entry.state_bytes - entry.upload_bytes
+
+
+def discard_upload(uploaded_file):
+    """Drop the upload manager's copy of a file once it has been stored elsewhere"""
+    ctx = get_script_run_ctx()
+    if ctx is not None and Runtime.exists():
+        Runtime.instance().uploaded_file_mgr.remove_file(ctx.session_id, uploaded_file.file_id)
+
+
+def _sweep(sessions, now):
+    runtime = Runtime.instance()
+    for session_id, entry in list(sessions.items()):
+        if not runtime.is_active_session(session_id):
+            del sessions[session_id]
+        elif not entry.swapped and now - entry.last_seen > IDLE_SECONDS:
+            swap_out(session_id, entry)
+
+
+def track(page):
+    """Account for the running session and swap out idle ones; call at the top of every page"""
+    ctx = get_script_run_ctx()
+    if ctx is None or not Runtime.exists():
+        return
+    sessions, lock, last_sweep = _registry()
+    now = time.monotonic()
+    with lock:
+        entry = sessions.get(ctx.session_id)
+        if entry is None:
+            entry = sessions[ctx.session_id] = _Session(ctx.session_state)
+        entry.page = page
+        entry.last_seen = now
+        entry.swapped = False
+        _measure(ctx.session_id, entry)
+        if entry.state_bytes + entry.upload_bytes > MAX_SESSION_BYTES:
+            swap_out(ctx.session_id, entry)
+        if now - last_sweep[0] > SWEEP_INTERVAL:
+            last_sweep[0] = now
+            _sweep(sessions, now)
+
+
+def _shared_bytes(sessions):
+    # Each cached workbook a session points at, counted once however many sessions share it
+    workbooks = {}
+    for entry in sessions.values():
+        for value in _state_items(entry.state).values():
+            if isinstance(value, SheetsRef):
+                try:
+                    # The cached workbook the reference resolves to; it parses no sheet by itself
+                    value = load_sheets(value.path)
+                except OSError:
+                    continue
+            if isinstance(value, Workbook):
+                workbooks[id(value)] = value
+    return sum(
+        int(frame.memory_usage(deep=True).sum())
+        for workbook in workbooks.values()
+        for frame in workbook.loaded().values()
+    )
+
+
+def summary():
+    """(frame with a row per session, totals); totals hold sessions, owned_bytes, shared_bytes, bytes_per_viewer"""
+    if not Runtime.exists():
+        return pd.DataFrame(), {"sessions": 0, "owned_bytes": 0, "shared_bytes": 0, "bytes_per_viewer": 0}
+    sessions, lock, _ = _registry()
+    now = time.monotonic()
+    with lock:
+        _sweep(sessions, now)
+        rows = [
+            {
+                "Session": session_id[:8],
+                "Page": entry.page,
+                "Idle (s)": now - entry.last_seen,
+                "State (KB)": entry.state_bytes / 1024,
+                "Uploads (KB)": entry.upload_bytes / 1024,
+                "Swapped Out": entry.swapped,
+            }
+            for session_id, entry in sessions.items()
+        ]
+        owned = sum(entry.state_bytes + entry.upload_bytes for entry in sessions.values())
+        shared = _shared_bytes(sessions)
+    totals = {
+        "sessions": len(rows),
+        "owned_bytes": owned,
+        "shared_bytes": shared,
+        "bytes_per_viewer": (owned + shared) / len(rows) if rows else 0,
+    }
+    return pd.DataFrame(rows), totals
+
+
+def prometheus_text(totals):
+    """Session totals from summary() in the Prometheus text exposition format"""
+    lines = []
+    for key, kind, help_text in [
+        ("sessions", "gauge", "Sessions with an open connection"),
+        ("owned_bytes", "gauge", "Bytes held by sessions for themselves"),
+        ("shared_bytes", "gauge", "Bytes of cached sheets referenced by sessions"),
+        ("bytes_per_viewer", "gauge", "Owned plus shared bytes per session"),
+    ]:
+        name = f"utility_session_{key}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {totals[key]:.6g}"]
+    return "\n".join(lines) + "\n"
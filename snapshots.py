@@ -0,0 +1,106 @@
+"""Immutable Corridor Work snapshots taken at ingest, and the diff between any two.
+
+Each snapshot is one Parquet file under data/snapshots holding every station's
+Corridor Work rows. A row is identified by (station, corridor, section, task,
+breakdown, size, occurrence), where occurrence numbers the rows that share the
+rest of the key in sheet order: the workbooks repeat some breakdowns within a
+section. The key is hashed to one uint64 per row, so a diff is a single hash
+join on that column.
+"""
+import functools
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+SNAPSHOT_DIR = os.path.join("data", "snapshots")
+INDEX_PATH = os.path.join(SNAPSHOT_DIR, "index.json")
+KEY_COLUMNS = ["station", "corridor", "section", "task", "breakdown", "size", "occurrence"]
+VALUE_COLUMNS = ["planned", "actual"]
+
+
+def snapshot_frame(corridor_work_by_station):
+    """Normalize the Corridor Work sheets of several stations into keyed snapshot rows"""
+    frames = []
+    for station, work in corridor_work_by_station.items():
+        frame = pd.DataFrame({
+            "station": station,
+            "corridor": work["Corridor"].astype(str),
+            "section": work["Section"].astype(str),
+            "task": work["Task Group"].astype(str),
+            "breakdown": work["Work Breakdown"].astype(str),
+            "size": work["Size"].astype(str),
+            "planned": pd.to_numeric(work["Planned"], errors="coerce"),
+            "actual": pd.to_numeric(work["Actual"], errors="coerce"),
+        })
+        frame["occurrence"] = frame.groupby(KEY_COLUMNS[:-1], sort=False).cumcount()
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["key"] + KEY_COLUMNS + VALUE_COLUMNS)
+    snapshot = pd.concat(frames, ignore_index=True)
+    snapshot.insert(0, "key", pd.util.hash_pandas_object(snapshot[KEY_COLUMNS], index=False).to_numpy())
+    return snapshot[["key"] + KEY_COLUMNS + VALUE_COLUMNS]
+
+
+def list_snapshots():
+    """Snapshot entries (version, created, sources, digest), oldest first"""
+    try:
+        with open(INDEX_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _digest(snapshot):
+    return hashlib.sha256(pd.util.hash_pandas_object(snapshot, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def write_snapshot(snapshot, version, created, sources):
+    """Store a snapshot unless it equals the latest one; returns whether it was written"""
+    index = list_snapshots()
+    digest = _digest(snapshot)
+    if index and index[-1]["digest"] == digest:
+        return False
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(SNAPSHOT_DIR, f"{version}.parquet")
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".parquet.part")
+    os.close(fd)
+    snapshot.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    index.append({"version": version, "created": created, "sources": sources, "digest": digest})
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".json.part")
+    with os.fdopen(fd, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, INDEX_PATH)
+    return True
+
+
+@functools.lru_cache(maxsize=8)
+def load_snapshot(version):
+    # Snapshots never change once written, so they can be cached by version alone
+    return pd.read_parquet(os.path.join(SNAPSHOT_DIR, f"{version}.parquet"))
+
+
+def diff(old, new):
+    """Rows added, removed or with changed Planned/Actual between two snapshots.
+
+    Returns the key columns, old and new values, their deltas and a change column.
+    """
+    merged = old.merge(new, on="key", how="outer", suffixes=("_old", "_new"), indicator=True)
+    for column in KEY_COLUMNS:
+        merged[column] = merged[f"{column}_new"].fillna(merged[f"{column}_old"])
+    for column in VALUE_COLUMNS:
+        merged[f"{column}_delta"] = merged[f"{column}_new"].fillna(0) - merged[f"{column}_old"].fillna(0)
+
+    change = merged["_merge"].map({"left_only": "removed", "right_only": "added", "both": "changed"}).astype(str)
+    changed = (merged["planned_delta"] != 0) | (merged["actual_delta"] != 0) | (change != "changed")
+    return (
+        merged.loc[changed]
+        .assign(change=change[changed])
+        [KEY_COLUMNS + ["change"] + [f"{c}_{s}" for c in VALUE_COLUMNS for s in ("old", "new", "delta")]]
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,160 @@
+"""Read-only SQL over every station's sheets, the issue log and the progress summary.
+
+Each workbook sheet is one DuckDB view across all stations, named and with
+columns in snake_case and a station column first: corridor_work, progress,
+remaining, issue_log, images... ("Task Group" becomes task_group, "Progress
+(%)" progress_pct). The live issue database is the issues view and
+data/progress.xlsx is station_progress.
+
+DuckDB scans the bundle's memory-mapped Arrow tables in place when the bundle
+is current for a workbook, and Arrow views of the cached frames otherwise, so
+no query touches an xlsx file. External file and network access are off and
+only a single SELECT is accepted. A query is interrupted after
+UTILITY_SQL_TIMEOUT seconds (default 5) and its result cut at
+UTILITY_SQL_MAX_ROWS rows (default 10000).
+"""
+import os
+import re
+import threading
+import time
+
+import duckdb
+import pyarrow as pa
+import streamlit as st
+
+import bundle
+import issue_db
+from data_store import load_sheets, station_fingerprint
+from issue_store import load_issues
+
+QUERY_TIMEOUT = float(os.environ.get("UTILITY_SQL_TIMEOUT", 5))
+MAX_ROWS = int(os.environ.get("UTILITY_SQL_MAX_ROWS", 10000))
+PROGRESS_FILE = os.path.join("data", "progress.xlsx")
+
+
+class QueryError(ValueError):
+    pass
+
+
+def sql_name(name):
+    """snake_case identifier for a sheet or column name"""
+    name = str(name).replace("%", " pct ").lower()
+    return re.sub(r"[^0-9a-z]+", "_", name).strip("_") or "column"
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sheet_table(path, mtime, sheet):
+    # The bundle's file mapped as is; otherwise the cached frame, whose numeric columns Arrow wraps without copying
+    table = bundle.sheet_table(path, sheet, mtime)
+    return table if table is not None else pa.Table.from_pandas(load_sheets(path)[sheet], preserve_index=False)
+
+
+def _select(sources, source, table, extra):
+    """SELECT of a source table with snake_case columns, plus constant columns"""
+    sources[source] = table
+    columns = [f"{_literal(value)} AS {name}" for name, value in extra.items()]
+    columns += [f"{_quote(column)} AS {_quote(sql_name(column))}" for column in table.column_names
+                if sql_name(column) not in extra]
+    return f"SELECT {', '.join(columns)} FROM {_quote(source)}"
+
+
+def version():
+    """Changes whenever a workbook, the progress summary or the issue database does"""
+    progress_mtime = os.path.getmtime(PROGRESS_FILE) if os.path.exists(PROGRESS_FILE) else None
+    return station_fingerprint(), progress_mtime, issue_db.revision()
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _engine(data_version):
+    fingerprint, progress_mtime, _ = data_version
+    sources = {}
+    views = {}
+    for station, path, mtime in fingerprint:
+        for sheet in load_sheets(path):
+            source = f"{sql_name(station)}__{sql_name(sheet)}"
+            views.setdefault(sql_name(sheet), []).append(
+                _select(sources, source, _sheet_table(path, mtime, sheet), {"station": station})
+            )
+    if progress_mtime is not None:
+        for sheet in load_sheets(PROGRESS_FILE):
+            views.setdefault("station_progress", []).append(
+                _select(sources, f"progress__{sql_name(sheet)}", _sheet_table(PROGRESS_FILE, progress_mtime, sheet),
+                        {"sheet": sheet})
+            )
+    views["issues"] = [_select(sources, "issue_db", pa.Table.from_pandas(load_issues(), preserve_index=False), {})]
+
+    con = duckdb.connect(":memory:")
+    _register(con, sources)
+    for view, parts in views.items():
+        # Stations disagree on some column types (Section is 1 or "S1"); BY NAME unifies them
+        con.execute(f"CREATE VIEW {_quote(view)} AS " + " UNION ALL BY NAME ".join(parts))
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    return con, sources
+
+
+def _register(con, sources):
+    # Registrations belong to one connection (cursors included) and only point at the Arrow buffers
+    for name, table in sources.items():
+        con.register(name, table)
+
+
+def schema():
+    """{view: [(column, type), ...]} of every queryable view"""
+    con, sources = _engine(version())
+    rows = con.execute(
+        "SELECT table_name, column_name, data_type FROM information_schema.columns "
+        "ORDER BY table_name, ordinal_position"
+    ).fetchall()
+    tables = {}
+    for table, column, data_type in rows:
+        # The per-station sources stay queryable but only the combined views are listed
+        if table not in sources:
+            tables.setdefault(table, []).append((column, data_type))
+    return tables
+
+
+def run_query(sql, max_rows=MAX_ROWS, timeout=QUERY_TIMEOUT):
+    """Run one SELECT; returns (frame, truncated, seconds) or raises QueryError"""
+    try:
+        statements = duckdb.extract_statements(sql)
+    except duckdb.Error as e:
+        raise QueryError(str(e)) from None
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise QueryError("Only a single SELECT statement (optionally starting with WITH) can be run.")
+
+    # A cursor is its own connection to the shared database, so queries of several sessions run side by side
+    con, sources = _engine(version())
+    cursor = con.cursor()
+    _register(cursor, sources)
+    timer = threading.Timer(timeout, cursor.interrupt)
+    start = time.perf_counter()
+    timer.start()
+    try:
+        result = cursor.sql(statements[0].query).limit(max_rows + 1).fetch_arrow_table()
+    except duckdb.InterruptException:
+        raise QueryError(f"The query was stopped after {timeout:g} seconds.") from None
+    except duckdb.Error as e:
+        raise QueryError(str(e)) from None
+    finally:
+        timer.cancel()
+        cursor.close()
+    seconds = time.perf_counter() - start
+    return result.slice(0, max_rows).to_pandas(), result.num_rows > max_rows, seconds
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_query(data_version, sql, max_rows):
+    return run_query(sql, max_rows)
+
+
+def cached_query(sql, max_rows=MAX_ROWS):
+    """run_query with results shared across sessions until the data changes"""
+    return _cached_query(version(), sql.strip(), max_rows)
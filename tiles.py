@@ -0,0 +1,92 @@
+"""XYZ tile pyramids for plan drawings, served by Streamlit's static file server.
+
+Each drawing is tiled once, under the image store digest of its bytes, into
+static/tiles/<digest>/<z>/<x>/<y>.jpg. Zoom level max_zoom is the drawing at
+full resolution and every level below halves it, down to a single tile at 0.
+Edge tiles are padded to TILE_SIZE so Leaflet does not stretch them. A pyramid
+is built in a temporary directory and renamed into place, and meta.json marks
+it complete.
+"""
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+
+from PIL import Image, ImageOps
+
+import image_store
+
+TILE_DIR = os.path.join("static", "tiles")
+# Streamlit serves ./static under <base>/app/static when server.enableStaticServing is
+# on. Map viewers run in a component iframe at <base>/component/<name>/index.html.
+TILE_URL = "../../app/static/tiles"
+TILE_SIZE = 256
+BACKGROUND = (255, 255, 255)
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _pyramid_dir(digest):
+    return os.path.join(TILE_DIR, digest)
+
+
+def _write_level(img, level_dir):
+    columns = math.ceil(img.width / TILE_SIZE)
+    rows = math.ceil(img.height / TILE_SIZE)
+    for x in range(columns):
+        os.makedirs(os.path.join(level_dir, str(x)))
+        for y in range(rows):
+            box = (x * TILE_SIZE, y * TILE_SIZE,
+                   min((x + 1) * TILE_SIZE, img.width), min((y + 1) * TILE_SIZE, img.height))
+            tile = Image.new("RGB", (TILE_SIZE, TILE_SIZE), BACKGROUND)
+            tile.paste(img.crop(box), (0, 0))
+            tile.save(os.path.join(level_dir, str(x), f"{y}.jpg"), format="JPEG", quality=85)
+
+
+def _build(digest, destination):
+    with Image.open(image_store.object_path(digest)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    width, height = img.size
+    max_zoom = max(0, math.ceil(math.log2(max(width, height) / TILE_SIZE)))
+
+    os.makedirs(TILE_DIR, exist_ok=True)
+    build_dir = tempfile.mkdtemp(dir=TILE_DIR, prefix=".build-")
+    try:
+        level = img
+        for zoom in range(max_zoom, -1, -1):
+            _write_level(level, os.path.join(build_dir, str(zoom)))
+            # Each level halves the one above it, so every zoom is resampled once from its neighbour
+            level = level.reduce(2) if min(level.size) > 1 else level
+        meta = {"width": width, "height": height, "max_zoom": max_zoom, "tile_size": TILE_SIZE}
+        with open(os.path.join(build_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.replace(build_dir, destination)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    return meta
+
+
+def pyramid(digest):
+    """Metadata of the drawing's tile pyramid (size, max_zoom), building it on first request"""
+    meta_path = os.path.join(_pyramid_dir(digest), "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f)
+
+    with _locks_guard:
+        lock = _locks.setdefault(digest, threading.Lock())
+    with lock:
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                return json.load(f)
+        shutil.rmtree(_pyramid_dir(digest), ignore_errors=True)
+        return _build(digest, _pyramid_dir(digest))
+
+
+def tile_url(digest):
+    """Leaflet URL template of a pyramid, relative to a component iframe"""
+    return f"{TILE_URL}/{digest}/{{z}}/{{x}}/{{y}}.jpg"
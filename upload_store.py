@@ -0,0 +1,100 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import streamlit as st
+
+import image_store
+import photo_index
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# Upload references left behind by sessions that never removed their photos
+UPLOAD_REF_PREFIX = "report-upload:"
+UPLOAD_REF_MAX_AGE = 24 * 60 * 60
+
+
+class UploadTooLarge(image_store.ImageTooLarge):
+    pass
+
+
+class UploadNotAnImage(image_store.NotAnImage):
+    pass
+
+
+@st.cache_resource(show_spinner=False)
+def _workers():
+    # Shared by all sessions: one pool, plus the in-flight jobs keyed by digest
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-prep"), {}, threading.Lock()
+
+
+def prepared_path(digest):
+    return image_store.rendition_path(digest, "report")
+
+
+def store_upload(uploaded_file, ref):
+    """Stream an upload into the image store under ``ref`` and queue its report rendition and indexing.
+
+    Returns the SHA-256 digest of the photo. The same photo uploaded again, by
+    any session, is stored and downscaled only once.
+    """
+    image_store.expire_refs(UPLOAD_REF_PREFIX, UPLOAD_REF_MAX_AGE)
+    uploaded_file.seek(0)
+    try:
+        digest = image_store.put_stream(uploaded_file, UPLOAD_REF_PREFIX + ref, MAX_UPLOAD_BYTES)
+    except image_store.ImageTooLarge as e:
+        raise UploadTooLarge(f"{uploaded_file.name} is {e}") from None
+    except image_store.NotAnImage as e:
+        raise UploadNotAnImage(f"{uploaded_file.name} is {e}") from None
+
+    executor, jobs, lock = _workers()
+    with lock:
+        if digest not in jobs:
+            executor.submit(photo_index.update_index, [image_store.object_path(digest)])
+        _queue_rendition(executor, jobs, digest)
+    return digest
+
+
+def _queue_rendition(executor, jobs, digest):
+    # Called with the lock held. A job that failed, or whose rendition went with a released object, runs again
+    job = jobs.get(digest)
+    if job is None or (job.done() and (job.exception() is not None or not os.path.exists(prepared_path(digest)))):
+        jobs[digest] = executor.submit(image_store.rendition, digest, "report")
+
+
+def preparation_error(digest):
+    """The exception of a photo's failed rendition job; None while it runs or once it has succeeded"""
+    _, jobs, lock = _workers()
+    with lock:
+        job = jobs.get(digest)
+    return job.exception() if job is not None and job.done() else None
+
+
+def retry_preparation(digest):
+    executor, jobs, lock = _workers()
+    with lock:
+        _queue_rendition(executor, jobs, digest)
+
+
+def release_upload(digest, ref):
+    image_store.release(digest, UPLOAD_REF_PREFIX + ref)
+
+
+def prepared_image(digest, timeout=30):
+    """Path of the downscaled JPEG, waiting for its background job if still running"""
+    _, jobs, lock = _workers()
+    with lock:
+        job = jobs.get(digest)
+    if job is not None:
+        try:
+            job.result(timeout=timeout)
+        except FutureTimeout:
+            raise
+        except Exception:
+            # A failed job is tried once more below, which raises if it fails again
+            pass
+        finally:
+            if job.done():
+                with lock:
+                    if jobs.get(digest) is job:
+                        jobs.pop(digest)
+    return image_store.rendition(digest, "report")
@@ -0,0 +1,166 @@
+"""Warm the shared caches at process start and report when an instance is ready.
+
+    python warmup.py --server.port 8501        # instead of: streamlit run Utility.py
+
+Runs ``streamlit run Utility.py`` in this process, with any extra arguments,
+after starting a background thread pool. Once the Streamlit runtime is up,
+the pool loads every registered station's sheets, the progress summary, the
+rollup cube, the bundle's aggregates and figures, S-curve figures, the
+progress chart and route map, photo renditions and plan tiles. Streamlit's
+caches live in the process, so the warm-up has to run in the same one.
+
+Readiness is served on a separate port, because Streamlit's own
+/_stcore/health turns healthy as soon as it listens. GET /ready returns 503
+while warming and 200 afterwards. A task that fails, or a task list that
+cannot be built, keeps it at 503, since the caches are not all hot; set
+UTILITY_READY_WITH_ERRORS=1 to report ready anyway once every task has run.
+The errors are listed in the response either way. Point the orchestrator's
+readiness probe there:
+
+    UTILITY_READY_PORT=8503 (default)
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+READY_PORT = int(os.environ.get("UTILITY_READY_PORT", 8503))
+READY_WITH_ERRORS = os.environ.get("UTILITY_READY_WITH_ERRORS", "0") == "1"
+
+
+class Warmup:
+    """Runs named tasks once in a thread pool and tracks whether they have all finished"""
+
+    def __init__(self, tasks, workers=4):
+        self.tasks = tasks
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._thread = None
+        self._state = {"total": 0, "done": 0, "errors": [], "started": None, "seconds": None}
+
+    def start(self, wait_for=None):
+        """Start warming in the background; ``wait_for`` is polled until true first"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(wait_for,), name="warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self, wait_for):
+        while wait_for is not None and not wait_for():
+            time.sleep(0.1)
+        start = time.perf_counter()
+        try:
+            tasks = self.tasks()
+        except Exception as e:
+            # An import error or a missing data file: nothing to warm, but say why
+            with self._lock:
+                self._state["errors"].append(f"task list: {e!r}")
+                self._state["seconds"] = time.perf_counter() - start
+            return
+        with self._lock:
+            self._state.update(total=len(tasks), started=time.time())
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="warmup") as pool:
+            jobs = {pool.submit(task): name for name, task in tasks}
+            for job in as_completed(jobs):
+                with self._lock:
+                    self._state["done"] += 1
+                    if job.exception() is not None:
+                        self._state["errors"].append(f"{jobs[job]}: {job.exception()!r}")
+        with self._lock:
+            self._state["seconds"] = time.perf_counter() - start
+
+    def status(self):
+        # Ready once every task has run, and only without errors unless READY_WITH_ERRORS
+        with self._lock:
+            finished = self._state["seconds"] is not None
+            ready = finished and (READY_WITH_ERRORS or not self._state["errors"])
+            return {**self._state, "errors": list(self._state["errors"]), "finished": finished, "ready": ready}
+
+
+def app_tasks():
+    """(name, callable) for every cache a first Streamlit viewer would otherwise fill"""
+    import bundle
+    import corridor_map
+    import image_store
+    import rollups
+    import tiles
+    from aggregates import STATION_AGGREGATES
+    from data_store import STATION_FILES, load_sheets
+    from plot_ProgressBar import warmProgressBar
+    from plot_sCurve import cachedSCurveFigure
+
+    def station(path):
+        sheets = load_sheets(path)
+        if "Progress" in sheets:
+            cachedSCurveFigure(sheets["Progress"])
+        for name in STATION_AGGREGATES:
+            bundle.aggregate(path, name)
+        bundle.figure(path, "s-curve")
+
+    def photos(workbook):
+        images = load_sheets(workbook).get("images")
+        if images is None:
+            return
+        for i, name in enumerate(images["image"]):
+            path = os.path.join("images", name)
+            if not os.path.exists(path):
+                continue
+            digest = image_store.put_file(path)
+            if i == 0:
+                tiles.pyramid(digest)
+            else:
+                image_store.rendition(digest, "grid")
+
+    tasks = [("progress", lambda: warmProgressBar(next(iter(load_sheets("data/progress.xlsx").values()))))]
+    for name, path in STATION_FILES.items():
+        if os.path.exists(path):
+            tasks.append((f"station {name}", lambda path=path: station(path)))
+            tasks.append((f"photos {name}", lambda path=path: photos(path)))
+    tasks.append(("rollups", rollups.materialize))
+    tasks.append(("corridor map", lambda: (corridor_map.geometry_url(), corridor_map.progress())))
+    return tasks
+
+
+WARMUP = Warmup(app_tasks)
+
+
+class _ReadyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/ready"):
+            self.send_error(404)
+            return
+        status = WARMUP.status()
+        body = json.dumps(status).encode()
+        self.send_response(200 if status["ready"] else 503)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    from streamlit.runtime import Runtime
+    from streamlit.web import cli
+
+    server = ThreadingHTTPServer(("0.0.0.0", READY_PORT), _ReadyHandler)
+    threading.Thread(target=server.serve_forever, name="readiness", daemon=True).start()
+    # cache_data entries made before the runtime exists would go to a throwaway store
+    WARMUP.start(wait_for=Runtime.exists)
+
+    sys.argv = ["streamlit", "run", "Utility.py", *sys.argv[1:]]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    # The diagnostics page imports this module by name and must see this WARMUP
+    sys.modules.setdefault("warmup", sys.modules[__name__])
+    sys.exit(main())